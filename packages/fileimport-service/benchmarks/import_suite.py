@@ -0,0 +1,414 @@
+"""
+End to end benchmark of the importers on a synthetic corpus, without a Speckle server.
+
+Usage:
+    python benchmarks/import_suite.py [--faces 10000 100000 1000000]
+        [--formats obj stl-binary stl-ascii ifc] [--obj-modes lines vectorized]
+        [--transport memory|sqlite] [--corpus-dir DIR] [--output results.json]
+        [--compare baseline.json]
+
+The corpus holds OBJ files with an MTL file and vertex colours, binary and ASCII STL
+files of `--faces` faces each, and IFC files of `--ifc-elements` extruded elements.
+`--corpus-dir` keeps it between runs, files which exist already are reused.
+
+OBJ and STL files go through `send_obj` / `send_stl`, the conversion and send of the
+importers, into a local memory or SQLite transport instead of a server. IFC files are
+opened and tessellated with ifcopenshell when it is installed, since the IFC
+conversion itself needs a server, and are skipped otherwise.
+
+Every case runs in its own process. The wall time, importer stages, peak RSS, and
+the objects and bytes produced are written to `--output` as JSON, and compared to
+the cases of a previous `--output` given as `--compare`.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import stl
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+
+from obj_parser import write_synthetic_obj  # noqa: E402
+from stl_import import write_synthetic_stl  # noqa: E402
+
+# Slower than this relative to the baseline is reported as a regression
+REGRESSION_THRESHOLD = 1.1
+
+
+def write_ascii_stl(path: str, face_count: int) -> None:
+    """ASCII STL of the same grid as `write_synthetic_stl`."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        binary_path = os.path.join(tmp_dir, "binary.stl")
+        write_synthetic_stl(binary_path, face_count)
+        stl.mesh.Mesh.from_file(binary_path).save(path, mode=stl.Mode.ASCII)
+
+
+_IFC_GUID_CHARS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz_$"
+
+
+def _ifc_guid(name: str) -> str:
+    """Deterministic IFC GlobalId, a uuid in the 22 character IFC base64 form."""
+    value = uuid.uuid5(uuid.NAMESPACE_URL, name).int
+    chars = []
+    for _ in range(22):
+        value, digit = divmod(value, 64)
+        chars.append(_IFC_GUID_CHARS[digit])
+    return "".join(reversed(chars))
+
+
+def write_synthetic_ifc(path: str, element_count: int) -> None:
+    """
+    IFC4 file with a project, site, building and storey containing a grid of
+    `element_count` proxy elements, each an extruded rectangle of its own height.
+    """
+    lines: List[str] = []
+
+    def add(entity: str) -> str:
+        lines.append(f"#{len(lines) + 1}={entity};")
+        return f"#{len(lines)}"
+
+    origin = add("IFCCARTESIANPOINT((0.,0.,0.))")
+    z_axis = add("IFCDIRECTION((0.,0.,1.))")
+    x_axis = add("IFCDIRECTION((1.,0.,0.))")
+    world = add(f"IFCAXIS2PLACEMENT3D({origin},{z_axis},{x_axis})")
+    context = add(f"IFCGEOMETRICREPRESENTATIONCONTEXT($,'Model',3,1.E-05,{world},$)")
+    body = add(
+        f"IFCGEOMETRICREPRESENTATIONSUBCONTEXT('Body','Model',*,*,*,*,{context},$,"
+        ".MODEL_VIEW.,$)"
+    )
+    length = add("IFCSIUNIT(*,.LENGTHUNIT.,$,.METRE.)")
+    units = add(f"IFCUNITASSIGNMENT(({length}))")
+    project = add(
+        f"IFCPROJECT('{_ifc_guid('project')}',$,'Benchmark',$,$,$,$,({context}),"
+        f"{units})"
+    )
+    site_placement = add(f"IFCLOCALPLACEMENT($,{world})")
+    site = add(
+        f"IFCSITE('{_ifc_guid('site')}',$,'Site',$,$,{site_placement},$,$,.ELEMENT.,"
+        "$,$,$,$,$)"
+    )
+    building_placement = add(f"IFCLOCALPLACEMENT({site_placement},{world})")
+    building = add(
+        f"IFCBUILDING('{_ifc_guid('building')}',$,'Building',$,$,"
+        f"{building_placement},$,$,.ELEMENT.,$,$,$)"
+    )
+    storey_placement = add(f"IFCLOCALPLACEMENT({building_placement},{world})")
+    storey = add(
+        f"IFCBUILDINGSTOREY('{_ifc_guid('storey')}',$,'Storey',$,$,"
+        f"{storey_placement},$,$,.ELEMENT.,0.)"
+    )
+    for parent, child in ((project, site), (site, building), (building, storey)):
+        add(f"IFCRELAGGREGATES('{_ifc_guid(parent + child)}',$,$,$,{parent},({child}))")
+
+    profile = add("IFCRECTANGLEPROFILEDEF(.AREA.,$,$,0.8,0.8)")
+    side = max(1, int(element_count**0.5))
+    elements = []
+    for i in range(element_count):
+        point = add(f"IFCCARTESIANPOINT(({float(i % side)},{float(i // side)},0.))")
+        axes = add(f"IFCAXIS2PLACEMENT3D({point},$,$)")
+        placement = add(f"IFCLOCALPLACEMENT({storey_placement},{axes})")
+        solid = add(
+            f"IFCEXTRUDEDAREASOLID({profile},{world},{z_axis},{1.0 + i % 5 * 0.5})"
+        )
+        representation = add(
+            f"IFCSHAPEREPRESENTATION({body},'Body','SweptSolid',({solid}))"
+        )
+        shape = add(f"IFCPRODUCTDEFINITIONSHAPE($,$,({representation}))")
+        elements.append(
+            add(
+                f"IFCBUILDINGELEMENTPROXY('{_ifc_guid(f'element {i}')}',$,"
+                f"'Element {i}',$,$,{placement},{shape},$,$)"
+            )
+        )
+    add(
+        f"IFCRELCONTAINEDINSPATIALSTRUCTURE('{_ifc_guid('contained')}',$,$,$,"
+        f"({','.join(elements)}),{storey})"
+    )
+
+    with open(path, "w") as f:
+        f.write(
+            "ISO-10303-21;\nHEADER;\n"
+            "FILE_DESCRIPTION(('ViewDefinition [ReferenceView]'),'2;1');\n"
+            f"FILE_NAME('{os.path.basename(path)}','2024-01-01T00:00:00',(''),(''),"
+            "'','','');\n"
+            "FILE_SCHEMA(('IFC4'));\nENDSEC;\nDATA;\n"
+        )
+        f.write("\n".join(lines))
+        f.write("\nENDSEC;\nEND-ISO-10303-21;\n")
+
+
+def build_corpus(corpus_dir: str, args) -> List[Dict[str, Any]]:
+    """Generate the missing corpus files, returns one case per file and mode."""
+    cases = []
+
+    def add_case(name: str, file_format: str, path: str, size: int, write, **env):
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            print(f"generating {path}")
+            write(path, size)
+        cases.append(
+            {
+                "case": name,
+                "format": file_format,
+                "file": path,
+                "size": size,
+                "fileBytes": os.path.getsize(path),
+                "env": env,
+            }
+        )
+
+    for faces in args.faces:
+        if "obj" in args.formats:
+            # the OBJ file of the daemon is always named `file`, next to its MTLs
+            path = os.path.join(corpus_dir, f"obj-{faces}", "file")
+            for mode in args.obj_modes:
+                add_case(
+                    f"obj-{mode}-{faces}",
+                    "obj",
+                    path,
+                    faces,
+                    lambda path, faces: write_synthetic_obj(
+                        path, faces, mtllib="materials.mtl"
+                    ),
+                    OBJ_PARSER_MODE=mode,
+                )
+        if "stl-binary" in args.formats:
+            path = os.path.join(corpus_dir, f"stl-binary-{faces}.stl")
+            add_case(f"stl-binary-{faces}", "stl", path, faces, write_synthetic_stl)
+        if "stl-ascii" in args.formats:
+            path = os.path.join(corpus_dir, f"stl-ascii-{faces}.stl")
+            add_case(f"stl-ascii-{faces}", "stl", path, faces, write_ascii_stl)
+    if "ifc" in args.formats:
+        for elements in args.ifc_elements:
+            path = os.path.join(corpus_dir, f"ifc-{elements}.ifc")
+            add_case(f"ifc-{elements}", "ifc", path, elements, write_synthetic_ifc)
+    return cases
+
+
+def local_transport(kind: str, work_dir: str):
+    """Transport counting the objects and bytes written to a local transport."""
+    from specklepy.transports.abstract_transport import AbstractTransport
+    from specklepy.transports.memory import MemoryTransport
+    from specklepy.transports.sqlite import SQLiteTransport
+
+    class CountingTransport(AbstractTransport):
+        def __init__(self, transport: AbstractTransport) -> None:
+            self.transport = transport
+            self.objects = 0
+            self.bytes = 0
+
+        @property
+        def name(self) -> str:
+            return f"Counting{self.transport.name}"
+
+        def begin_write(self) -> None:
+            self.transport.begin_write()
+
+        def end_write(self) -> None:
+            self.transport.end_write()
+
+        def save_object(self, id: str, serialized_object: str) -> None:
+            self.objects += 1
+            self.bytes += len(serialized_object)
+            self.transport.save_object(id, serialized_object)
+
+        def save_object_from_transport(
+            self, id: str, source_transport: AbstractTransport
+        ) -> None:
+            self.transport.save_object_from_transport(id, source_transport)
+
+        def get_object(self, id: str) -> Optional[str]:
+            return self.transport.get_object(id)
+
+        def has_objects(self, id_list: List[str]) -> Dict[str, bool]:
+            return self.transport.has_objects(id_list)
+
+        def copy_object_and_children(
+            self, id: str, target_transport: AbstractTransport
+        ) -> str:
+            return self.transport.copy_object_and_children(id, target_transport)
+
+    if kind == "sqlite":
+        return CountingTransport(SQLiteTransport(base_path=work_dir, scope="objects"))
+    return CountingTransport(MemoryTransport())
+
+
+def measure(file_format: str, file_path: str, transport_kind: str) -> None:
+    """Run one case in this process, printing its result as JSON."""
+    result: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        if file_format == "ifc":
+            result = measure_ifc(file_path)
+        else:
+            sys.path.insert(0, str(SRC_DIR / file_format))
+            import import_file
+            from import_stats import stage_timer
+
+            transport = local_transport(transport_kind, work_dir)
+            send = (
+                import_file.send_obj if file_format == "obj" else import_file.send_stl
+            )
+            start = time.perf_counter()
+            result["rootId"] = send(file_path, lambda: transport)
+            result["seconds"] = time.perf_counter() - start
+            result["objects"] = transport.objects
+            result["bytes"] = transport.bytes
+            result["stages"] = stage_timer.durations
+
+    from import_stats import peak_rss_bytes
+
+    result["peakRssBytes"] = peak_rss_bytes()
+    print(json.dumps(result))
+
+
+def measure_ifc(file_path: str) -> Dict[str, Any]:
+    """Open and tessellate an IFC file, the bulk of the work of the IFC importer."""
+    sys.path.insert(0, str(SRC_DIR / "common"))
+    from import_stats import stage_timer
+
+    try:
+        import ifcopenshell
+        import ifcopenshell.geom
+    except ImportError:
+        return {"skipped": "ifcopenshell is not installed"}
+
+    start = time.perf_counter()
+    with stage_timer.stage("parse"):
+        model = ifcopenshell.open(file_path)
+    shapes = 0
+    geometry_bytes = 0
+    with stage_timer.stage("tessellate"):
+        iterator = ifcopenshell.geom.iterator(
+            ifcopenshell.geom.settings(), model, os.cpu_count() or 1
+        )
+        if iterator.initialize():
+            while True:
+                geometry = iterator.get().geometry
+                shapes += 1
+                geometry_bytes += (
+                    np.asarray(geometry.verts).nbytes
+                    + np.asarray(geometry.faces).nbytes
+                )
+                if not iterator.next():
+                    break
+    return {
+        "seconds": time.perf_counter() - start,
+        "objects": shapes,
+        "bytes": geometry_bytes,
+        "stages": stage_timer.durations,
+    }
+
+
+def run_case(case: Dict[str, Any], transport_kind: str) -> Dict[str, Any]:
+    output = subprocess.run(
+        [
+            sys.executable,
+            __file__,
+            "--measure",
+            case["format"],
+            case["file"],
+            transport_kind,
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+        env={**os.environ, **case["env"]},
+    ).stdout
+    return {**case, **json.loads(output.strip().splitlines()[-1])}
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str) -> bool:
+    """Print the changes to a baseline, returns False if a case got slower."""
+    with open(baseline_path) as f:
+        baseline = {result["case"]: result for result in json.load(f)["results"]}
+    print(f"\ncompared to {baseline_path}:")
+    regressed = False
+    for result in results:
+        before = baseline.get(result["case"])
+        if not before or "seconds" not in before or "seconds" not in result:
+            continue
+        ratio = result["seconds"] / before["seconds"]
+        memory = result["peakRssBytes"] / before["peakRssBytes"]
+        flag = ""
+        if ratio > REGRESSION_THRESHOLD:
+            regressed = True
+            flag = " SLOWER"
+        print(
+            f"{result['case']:>28} time {ratio:6.2f}x memory {memory:6.2f}x"
+            f" bytes {result['bytes'] - before['bytes']:+d}{flag}"
+        )
+    return not regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--faces", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--ifc-elements", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument(
+        "--formats",
+        nargs="+",
+        default=["obj", "stl-binary", "stl-ascii", "ifc"],
+        choices=["obj", "stl-binary", "stl-ascii", "ifc"],
+    )
+    parser.add_argument("--obj-modes", nargs="+", default=["lines", "vectorized"])
+    parser.add_argument("--transport", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--corpus-dir", type=str, default=None)
+    parser.add_argument("--output", type=str, default=None)
+    parser.add_argument("--compare", type=str, default=None)
+    parser.add_argument("--measure", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(*args.measure)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cases = build_corpus(args.corpus_dir or tmp_dir, args)
+        print(
+            f"{'case':>28} {'MB':>8} {'time (s)':>9} {'peak RSS (MB)':>14}"
+            f" {'objects':>9} {'sent MB':>9}"
+        )
+        results = []
+        for case in cases:
+            result = run_case(case, args.transport)
+            results.append(result)
+            if "skipped" in result:
+                print(f"{case['case']:>28} skipped: {result['skipped']}")
+                continue
+            print(
+                f"{case['case']:>28} {case['fileBytes'] / 1e6:8.1f}"
+                f" {result['seconds']:9.2f} {result['peakRssBytes'] / 2**20:14.0f}"
+                f" {result['objects']:9d} {result['bytes'] / 1e6:9.1f}"
+            )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "cpus": os.cpu_count(),
+                    "transport": args.transport,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+    if args.compare and not compare(results, args.compare):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Start up time of the importer scripts, from `python -X importtime` reports.
+
+Usage:
+    python benchmarks/importer_startup.py [--importers obj stl] [--repeats 5]
+        [--top 10] [--output startup.json] [--compare baseline.json]
+
+For every importer two cases are measured, each in fresh processes:
+- `module`: importing the importer script, what runs before it parses the file.
+- `run`: the module plus the client stack the importer connects to the server with,
+  which `server_connection` imports in a background thread.
+
+The wall time of the process and the total import time are the best of `--repeats`
+runs, and the slowest imports of the best run are listed. Results are written to
+`--output` as JSON, and compared to a previous `--output` given as `--compare`.
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+# Everything `ServerConnection` imports before connecting
+CLIENT_STACK = [
+    "specklepy.api.operations",
+    "specklepy.api.client",
+    "specklepy.core.api.inputs",
+    "specklepy.transports.server",
+]
+# Start up times are noisy, a case is only flagged above this ratio
+REGRESSION_THRESHOLD = 1.2
+
+
+def parse_importtime(report: str) -> List[Dict[str, Any]]:
+    """The imports of a `-X importtime` report, with their depth and times in s."""
+    imports = []
+    for line in report.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        imports.append(
+            {
+                "module": name.strip(),
+                "depth": (len(name) - len(name.lstrip())) // 2,
+                "self": int(self_us) / 1e6,
+                "cumulative": int(cumulative_us) / 1e6,
+            }
+        )
+    return imports
+
+
+def measure(importer: str, case: str) -> Dict[str, Any]:
+    statements = [
+        "import sys",
+        f"sys.path.insert(0, {str(SRC_DIR / importer)!r})",
+        "import import_file",
+    ]
+    if case == "run":
+        statements += [f"import {module}" for module in CLIENT_STACK]
+    start = time.perf_counter()
+    report = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "; ".join(statements)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stderr
+    seconds = time.perf_counter() - start
+    imports = parse_importtime(report)
+    return {
+        "seconds": seconds,
+        "importSeconds": sum(item["self"] for item in imports),
+        "modules": len(imports),
+        "imports": imports,
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str) -> bool:
+    """Print the changes to a baseline, returns False if a case got slower."""
+    with open(baseline_path) as f:
+        baseline = {result["case"]: result for result in json.load(f)["results"]}
+    print(f"\ncompared to {baseline_path}:")
+    regressed = False
+    for result in results:
+        before = baseline.get(result["case"])
+        if not before:
+            continue
+        ratio = result["importSeconds"] / before["importSeconds"]
+        flag = ""
+        if ratio > REGRESSION_THRESHOLD:
+            regressed = True
+            flag = " SLOWER"
+        print(
+            f"{result['case']:>12} imports {ratio:6.2f}x"
+            f" modules {result['modules'] - before['modules']:+d}{flag}"
+        )
+    return not regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--importers", nargs="+", default=["obj", "stl"], choices=["obj", "stl"]
+    )
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--output", type=str, default=None)
+    parser.add_argument("--compare", type=str, default=None)
+    args = parser.parse_args()
+
+    results = []
+    for importer in args.importers:
+        for case in ["module", "run"]:
+            runs = [measure(importer, case) for _ in range(args.repeats)]
+            best = min(runs, key=lambda run: run["importSeconds"])
+            result = {
+                "case": f"{importer}-{case}",
+                "seconds": min(run["seconds"] for run in runs),
+                "importSeconds": best["importSeconds"],
+                "modules": best["modules"],
+                # the slowest imports of the importer, not of their dependencies
+                "slowest": sorted(
+                    (
+                        {"module": item["module"], "cumulative": item["cumulative"]}
+                        for item in best["imports"]
+                        if item["depth"] <= 1
+                    ),
+                    key=lambda item: item["cumulative"],
+                    reverse=True,
+                )[: args.top],
+            }
+            results.append(result)
+            print(
+                f"\n{result['case']}: {result['seconds'] * 1000:.0f} ms wall,"
+                f" {result['importSeconds'] * 1000:.0f} ms importing"
+                f" {result['modules']} modules"
+            )
+            for item in result["slowest"]:
+                print(f"{item['cumulative'] * 1000:10.1f} ms  {item['module']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+    if args.compare and not compare(results, args.compare):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
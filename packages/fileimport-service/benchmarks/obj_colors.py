@@ -0,0 +1,88 @@
+"""
+Microbenchmark and parity check of the OBJ colour packing (`pack_argb`).
+
+Usage:
+    python benchmarks/obj_colors.py [--sizes 100000 1000000 10000000]
+
+Random vertex colours, including the 0 and 1 extremes, are packed into signed ARGB
+ints and compared with the former per-colour `int.from_bytes` packing, which is
+timed as well up to `--loop-max-colors`.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src" / "obj"))
+
+from import_file import pack_argb  # noqa: E402
+
+
+def loop_pack(colors: np.ndarray):
+    """The former conversion: one `int.from_bytes` call per colour."""
+    packed = []
+    for r, g, b in colors.tolist():
+        argb = (1.0, r, g, b)
+        packed.append(
+            int.from_bytes(
+                [int(val * 255) for val in argb], byteorder="big", signed=True
+            )
+        )
+    return packed
+
+
+def random_colors(count: int, seed: int = 0) -> np.ndarray:
+    colors = np.random.default_rng(seed).random((count, 3))
+    colors[: min(count, 8)] = [
+        [0, 0, 0],
+        [1, 1, 1],
+        [1, 0, 0],
+        [0, 1, 0],
+        [0, 0, 1],
+        [0.5, 0.5, 0.5],
+        [1 / 255, 254 / 255, 128 / 255],
+        [0.999999, 0.000001, 0.25],
+    ][: min(count, 8)]
+    return colors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[100000, 1000000, 10000000]
+    )
+    parser.add_argument("--loop-max-colors", type=int, default=1000000)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        colors = random_colors(size)
+
+        start = time.perf_counter()
+        packed = pack_argb(colors).tolist()
+        array_seconds = time.perf_counter() - start
+        line = f"{size:>10} colors: arrays {array_seconds:8.3f}s"
+
+        if size <= args.loop_max_colors:
+            start = time.perf_counter()
+            expected = loop_pack(colors)
+            loop_seconds = time.perf_counter() - start
+            if packed != expected:
+                mismatch = next(
+                    i for i, (a, b) in enumerate(zip(packed, expected)) if a != b
+                )
+                sys.exit(
+                    f"colour {colors[mismatch].tolist()} packed to"
+                    f" {packed[mismatch]}, expected {expected[mismatch]}"
+                )
+            line += (
+                f", loop {loop_seconds:8.3f}s ({loop_seconds / array_seconds:.0f}x),"
+                " identical"
+            )
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
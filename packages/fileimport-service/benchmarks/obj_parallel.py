@@ -0,0 +1,86 @@
+"""
+Scaling of the parallel OBJ parser (`OBJ_PARSER_MODE=parallel`) with the number of
+processes.
+
+Usage:
+    python benchmarks/obj_parallel.py [--faces N] [--file path/to/file.obj]
+        [--processes 1 2 4 8 16]
+
+Without `--file` the synthetic OBJ of `obj_parser.py` is generated. Every run must
+produce the same `objects` as the vectorized parser, the time, throughput and
+speedup over the vectorized parser are reported for each number of processes.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src" / "obj"))
+sys.path.insert(1, str(Path(__file__).resolve().parent.parent / "src" / "common"))
+
+import obj_parallel_parser  # noqa: E402
+from obj_file import ObjFile  # noqa: E402
+from obj_parser import objects_equal, write_synthetic_obj  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--faces", type=int, default=10_000_000)
+    parser.add_argument("--file", type=str, default=None)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument(
+        "--min-range-mb",
+        type=float,
+        default=obj_parallel_parser.MIN_RANGE_SIZE / 2**20,
+        help="smallest byte range given to a process",
+    )
+    args = parser.parse_args()
+    obj_parallel_parser.MIN_RANGE_SIZE = int(args.min_range_mb * 2**20)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = args.file
+        if not file_path:
+            file_path = os.path.join(tmp_dir, "synthetic.obj")
+            write_synthetic_obj(file_path, args.faces)
+        size_mb = os.path.getsize(file_path) / 1e6
+
+        start = time.perf_counter()
+        expected = ObjFile(file_path, vectorized=True)
+        vectorized_time = time.perf_counter() - start
+        print(f"file: {size_mb:.1f} MB, {expected.face_count} faces")
+        print(f"CPUs: {os.cpu_count()}")
+        print(
+            f"vectorized:    {vectorized_time:8.2f}s"
+            f" {size_mb / vectorized_time:8.1f} MB/s"
+        )
+
+        failed = False
+        for processes in args.processes:
+            ranges = len(
+                obj_parallel_parser.split_ranges(
+                    file_path, processes, obj_parallel_parser.MIN_RANGE_SIZE
+                )
+            )
+            start = time.perf_counter()
+            # as in the importer, a single process falls back to the vectorized parser
+            obj = ObjFile(file_path, vectorized=True, processes=processes)
+            elapsed = time.perf_counter() - start
+            identical = objects_equal(expected.objects, obj.objects)
+            failed |= not identical
+            print(
+                f"{processes:>2} processes: {elapsed:8.2f}s"
+                f" {size_mb / elapsed:8.1f} MB/s"
+                f" {vectorized_time / elapsed:6.2f}x ({ranges} ranges)"
+                + ("" if identical else " DIFFERENT OBJECTS")
+            )
+
+    if failed:
+        print("ERROR: the parallel parser produced different objects")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
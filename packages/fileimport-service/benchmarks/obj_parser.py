@@ -0,0 +1,121 @@
+"""
+Compares the line based and the vectorized OBJ parsers.
+
+Usage:
+    python benchmarks/obj_parser.py [--faces N] [--file path/to/file.obj]
+
+Without `--file` a synthetic OBJ is generated. Both parsers must produce identical
+`objects`, the throughput of each is reported in MB/s.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src" / "obj"))
+sys.path.insert(1, str(Path(__file__).resolve().parent.parent / "src" / "common"))
+
+import numpy as np  # noqa: E402
+from obj_file import ObjFile  # noqa: E402
+
+
+def write_synthetic_obj(
+    path: str, face_count: int, objects: int = 8, mtllib: Optional[str] = None
+) -> None:
+    """Writes grid meshes split across objects and materials, mixing vertex colors,
+    `v/vt/vn` references and relative indices. With `mtllib`, the materials are
+    written to that MTL file next to the OBJ file."""
+    faces_per_object = max(1, face_count // objects)
+    side = max(1, int((faces_per_object / 2) ** 0.5))
+    vertex_offset = 0
+    if mtllib:
+        with open(os.path.join(os.path.dirname(path), mtllib), "w") as f:
+            for material in range(3):
+                f.write(f"newmtl Material_{material}\n")
+                f.write(f"Kd {0.2 * material:.1f} 0.5 0.8\nKs 1.0 1.0 1.0\n")
+                f.write(f"Ns 10.0\nd {1.0 - 0.25 * material:.2f}\nillum 2\n")
+    with open(path, "w") as f:
+        f.write("# synthetic benchmark file\n")
+        if mtllib:
+            f.write(f"mtllib {mtllib}\n")
+        for obj in range(objects):
+            f.write(f"o Object_{obj}\n")
+            colored = obj % 2 == 1
+            for i in range(side + 1):
+                for j in range(side + 1):
+                    if colored:
+                        f.write(f"v {i} {j} {obj} 0.5 {i / (side + 1):.4f} 0.25\n")
+                    else:
+                        f.write(f"v {i:.6f} {j:.6f} {obj * 0.5:.6f}\n")
+            f.write("vt 0.0 0.0\nvn 0.0 0.0 1.0\n")
+            for i in range(side):
+                f.write(f"usemtl Material_{(obj + i) % 3}\n")
+                for j in range(side):
+                    a = i * (side + 1) + j
+                    b, c, d = a + 1, a + side + 2, a + side + 1
+                    if obj % 3 == 2:
+                        count = (side + 1) ** 2
+                        a, b, c, d = (x - count for x in (a, b, c, d))
+                        f.write(f"f {a} {b} {c}\nf {a} {c} {d}\n")
+                    else:
+                        a, b, c, d = (x + vertex_offset + 1 for x in (a, b, c, d))
+                        f.write(f"f {a}/1/1 {b}/1/1 {c}/1/1 {d}/1/1\n")
+            vertex_offset += (side + 1) ** 2
+
+
+def objects_equal(left, right) -> bool:
+    if list(left) != list(right):
+        return False
+    for name in left:
+        if len(left[name]) != len(right[name]):
+            return False
+        for left_mesh, right_mesh in zip(left[name], right[name]):
+            for key, value in left_mesh.items():
+                other = right_mesh[key]
+                if isinstance(value, np.ndarray):
+                    if not np.array_equal(value, other):
+                        return False
+                elif value != other:
+                    return False
+    return True
+
+
+def run(file_path: str, vectorized: bool):
+    start = time.perf_counter()
+    obj = ObjFile(file_path, vectorized=vectorized)
+    return obj, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--faces", type=int, default=1_000_000)
+    parser.add_argument("--file", type=str, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = args.file
+        if not file_path:
+            file_path = os.path.join(tmp_dir, "synthetic.obj")
+            write_synthetic_obj(file_path, args.faces)
+        size_mb = os.path.getsize(file_path) / 1e6
+
+        lines_obj, lines_time = run(file_path, vectorized=False)
+        vectorized_obj, vectorized_time = run(file_path, vectorized=True)
+
+    print(f"file: {size_mb:.1f} MB, {lines_obj.face_count} faces")
+    print(f"lines:      {lines_time:8.2f}s {size_mb / lines_time:8.1f} MB/s")
+    print(f"vectorized: {vectorized_time:8.2f}s {size_mb / vectorized_time:8.1f} MB/s")
+    print(f"speedup:    {lines_time / vectorized_time:8.2f}x")
+
+    if not objects_equal(lines_obj.objects, vectorized_obj.objects):
+        print("ERROR: parsers produced different objects")
+        sys.exit(1)
+    print("objects: identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Microbenchmark of the OBJ global-to-local vertex remapping (`ObjFile.post_process`).
+
+Usage:
+    python benchmarks/obj_post_process.py [--sizes 1000000 10000000 50000000]
+
+Synthetic triangle meshes are split across objects and materials, then grouped with
+`split_faces`. The former per-index dict remapping is timed as well, up to
+`--dict-max-faces` since it takes minutes on the largest sizes.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src" / "obj"))
+sys.path.insert(1, str(Path(__file__).resolve().parent.parent / "src" / "common"))
+
+from obj_array_parser import split_faces  # noqa: E402
+
+
+def synthetic_mesh(face_count: int, objects: int, materials: int):
+    """Grid of triangles, grid rows are assigned to objects, columns to materials."""
+    side = max(1, int((face_count / 2) ** 0.5))
+    cols = np.arange(side)
+    a = (np.arange(side)[:, np.newaxis] * (side + 1) + cols).ravel()
+    b, c, d = a + 1, a + side + 2, a + side + 1
+    triangles = np.concatenate(
+        [np.stack([a, b, c], axis=1), np.stack([a, c, d], axis=1)], axis=1
+    ).reshape(-1, 3)
+
+    face_indices = triangles.ravel().astype(np.int32)
+    face_offsets = np.arange(len(triangles) + 1, dtype=np.int64) * 3
+    rows = np.repeat(np.arange(side), 2 * side)
+    columns = np.tile(np.repeat(cols, 2), side)
+    face_objects = (rows * objects // side).astype(np.int64)
+    face_materials = (columns * materials // side).astype(np.int64)
+    return face_indices, face_offsets, face_objects * materials + face_materials
+
+
+def dict_remap(face_indices, face_offsets, face_groups):
+    """The former post_process: Python dicts, walking every index of every face."""
+    indices = face_indices.tolist()
+    offsets = face_offsets.tolist()
+    groups = {}
+    for i, group in enumerate(face_groups.tolist()):
+        groups.setdefault(group, []).append(indices[offsets[i] : offsets[i + 1]])
+    result = []
+    for group, faces in groups.items():
+        v_global2local_id = {}
+        vertices = []
+        local_faces = []
+        for face in faces:
+            for global_v in face:
+                if global_v not in v_global2local_id:
+                    v_global2local_id[global_v] = len(vertices)
+                    vertices.append(global_v)
+            local_faces.append([v_global2local_id[global_v] for global_v in face])
+        result.append((group, vertices, local_faces))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1_000_000, 10_000_000, 50_000_000]
+    )
+    parser.add_argument("--objects", type=int, default=64)
+    parser.add_argument("--materials", type=int, default=4)
+    parser.add_argument("--dict-max-faces", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    print(f"{'faces':>12} {'groups':>8} {'arrays (s)':>11} {'dicts (s)':>10}")
+    for size in args.sizes:
+        mesh = synthetic_mesh(size, args.objects, args.materials)
+        face_count = len(mesh[1]) - 1
+
+        start = time.perf_counter()
+        groups = list(split_faces(*mesh))
+        arrays_time = time.perf_counter() - start
+
+        dict_time = "-"
+        if face_count <= args.dict_max_faces:
+            start = time.perf_counter()
+            dict_remap(*mesh)
+            dict_time = f"{time.perf_counter() - start:10.2f}"
+
+        print(f"{face_count:12d} {len(groups):8d} {arrays_time:11.2f} {dict_time:>10}")
+
+
+if __name__ == "__main__":
+    main()
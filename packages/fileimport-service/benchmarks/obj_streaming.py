@@ -0,0 +1,81 @@
+"""
+Checks that `StreamingSender` writes the same objects as `operations.send`.
+
+Usage:
+    python benchmarks/obj_streaming.py [--faces N] [--file path/to/file.obj]
+
+`StreamingSender` relies on internals of specklepy's `BaseObjectSerializer`, which
+is why specklepy is pinned to an exact version. Run this after upgrading it: the
+converted objects of a file are sent once with `operations.send` and once element
+by element with `StreamingSender`, into memory transports. Both must produce the
+same root id and write the same objects, the send times are reported as well.
+Without `--file` the synthetic OBJ of `obj_parser.py` is generated, with materials.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from specklepy.api import operations
+from specklepy.objects.models.collections.collection import Collection
+from specklepy.transports.memory import MemoryTransport
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src" / "obj"))
+sys.path.insert(1, str(Path(__file__).resolve().parent.parent / "src" / "common"))
+
+from import_file import convert_objects  # noqa: E402
+from obj_file import ObjFile  # noqa: E402
+from obj_parser import write_synthetic_obj  # noqa: E402
+from streaming_sender import StreamingSender  # noqa: E402
+
+
+def send_streamed(root: Collection, transport: MemoryTransport) -> str:
+    """Send the elements of `root` one at a time, as `send_streaming` does."""
+    sender = StreamingSender([transport])
+    elements = [sender.send(element) for element in root.elements]
+    streamed_root = Collection(name=root.name, elements=elements)
+    for name in root.get_dynamic_member_names():
+        streamed_root[name] = root[name]
+    return sender.finish(streamed_root)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--faces", type=int, default=100_000)
+    parser.add_argument("--file", type=str, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_path = args.file
+        if not file_path:
+            file_path = os.path.join(tmp_dir, "synthetic.obj")
+            write_synthetic_obj(file_path, args.faces, mtllib="synthetic.mtl")
+        obj = ObjFile(file_path, vectorized=True)
+        root = convert_objects(obj.objects, os.path.basename(file_path))
+
+        expected = MemoryTransport()
+        start = time.perf_counter()
+        expected_id = operations.send(root, [expected], use_default_cache=False)
+        print(f"operations.send: {time.perf_counter() - start:8.2f}s")
+
+        streamed = MemoryTransport()
+        start = time.perf_counter()
+        streamed_id = send_streamed(root, streamed)
+        print(f"StreamingSender: {time.perf_counter() - start:8.2f}s")
+
+    print(f"root: {expected_id} / {streamed_id}, objects: {len(expected.objects)}")
+    if streamed_id != expected_id or streamed.objects != expected.objects:
+        missing = expected.objects.keys() - streamed.objects.keys()
+        extra = streamed.objects.keys() - expected.objects.keys()
+        print(
+            "ERROR: StreamingSender wrote different objects,"
+            f" {len(missing)} missing and {len(extra)} unexpected"
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Times STL parsing and Speckle Mesh construction and reports the peak RSS.
+
+Usage:
+    python benchmarks/stl_import.py [--sizes 100000 1000000 5000000] [--file f.stl]
+
+Every measurement runs in its own process so the peak RSS is not shared between
+runs. `loop` is the former per-face python loop, `arrays` is `convert_mesh` and
+`welded` is `convert_mesh` with exact vertex welding.
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import stl
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src" / "stl"))
+
+
+def write_synthetic_stl(path: str, face_count: int) -> None:
+    """Binary STL of a triangulated grid, written in blocks to keep memory low."""
+    side = max(1, int((face_count / 2) ** 0.5))
+    with open(path, "wb") as f:
+        f.write(b"\0" * 80)
+        f.write(np.uint32(2 * side * side).tobytes())
+        for i in range(side):
+            j = np.arange(side, dtype=np.float32)
+            a = np.stack([np.full_like(j, i), j, np.zeros_like(j)], axis=1)
+            b, c, d = a + (0, 1, 0), a + (1, 1, 0), a + (1, 0, 0)
+            triangles = np.concatenate(
+                [np.stack([a, b, c], axis=1), np.stack([a, c, d], axis=1)]
+            )
+            data = np.zeros(len(triangles), dtype=stl.mesh.Mesh.dtype)
+            data["vectors"] = triangles
+            f.write(data.tobytes())
+
+
+def convert_loop(stl_mesh):
+    from specklepy.objects.geometry import Mesh
+    from specklepy.objects.models.units import Units
+
+    vertices = stl_mesh.points.flatten().tolist()
+    faces = []
+    for i in range(stl_mesh.points.shape[0]):
+        faces.extend([3, 3 * i, 3 * i + 1, 3 * i + 2])
+    return Mesh(vertices=vertices, faces=faces, units=Units.none)
+
+
+def measure(file_path: str, mode: str) -> None:
+    from import_file import convert_mesh
+
+    start = time.perf_counter()
+    stl_mesh = stl.mesh.Mesh.from_file(file_path)
+    parsed = time.perf_counter()
+    if mode == "loop":
+        mesh = convert_loop(stl_mesh)
+    else:
+        mesh = convert_mesh(stl_mesh.vectors, 0.0 if mode == "welded" else None)
+    done = time.perf_counter()
+    meshes = mesh.displayValue if hasattr(mesh, "displayValue") else [mesh]
+    print(
+        json.dumps(
+            {
+                "faces": sum(len(m.faces) for m in meshes) // 4,
+                "vertices": sum(len(m.vertices) for m in meshes) // 3,
+                "parse": parsed - start,
+                "convert": done - parsed,
+                # kilobytes on linux
+                "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                / 1024,
+            }
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[100_000, 1_000_000, 5_000_000]
+    )
+    parser.add_argument("--file", type=str, default=None)
+    parser.add_argument("--measure", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(*args.measure)
+        return
+
+    print(
+        f"{'faces':>10} {'vertices':>10} {'mode':>7} {'parse (s)':>10} "
+        f"{'convert (s)':>12} {'peak RSS (MB)':>14}"
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        files = [args.file] if args.file else []
+        for size in [] if args.file else args.sizes:
+            files.append(os.path.join(tmp_dir, f"{size}.stl"))
+            write_synthetic_stl(files[-1], size)
+
+        for file_path in files:
+            for mode in ("loop", "arrays", "welded"):
+                output = subprocess.run(
+                    [sys.executable, __file__, "--measure", file_path, mode],
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                ).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                print(
+                    f"{result['faces']:10d} {result['vertices']:10d} {mode:>7} "
+                    f"{result['parse']:10.2f} "
+                    f"{result['convert']:12.2f} {result['peak_rss_mb']:14.0f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Compares reading STL files with numpy-stl and with `stl_reader.read_triangles`.
+
+Usage:
+    python benchmarks/stl_reader.py [--sizes 1000000 10000000 50000000]
+        [--ascii-max-faces 1000000] [--file f.stl]
+
+Binary files of every size are generated, ASCII ones up to `--ascii-max-faces`
+(they take about 250 bytes per face). Every measurement runs in its own process,
+so the peak RSS is not shared between runs. `reader` materializes the vertices as
+`convert_mesh` does, reading alone is a view of the mapped file for binary files.
+Both readers must return the same vertices.
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import stl
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src" / "stl"))
+
+from stl_import import write_synthetic_stl  # noqa: E402
+from stl_reader import read_triangles  # noqa: E402
+
+
+def measure(file_path: str, mode: str) -> None:
+    start = time.perf_counter()
+    if mode == "numpy-stl":
+        vertices = stl.mesh.Mesh.from_file(file_path).points.reshape(-1, 3)
+    else:
+        vertices = read_triangles(file_path).reshape(-1, 3)
+    seconds = time.perf_counter() - start
+    print(
+        json.dumps(
+            {
+                "faces": len(vertices) // 3,
+                "seconds": seconds,
+                # kilobytes on linux
+                "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                / 1024,
+            }
+        )
+    )
+
+
+def run(file_path: str, mode: str):
+    output = subprocess.run(
+        [sys.executable, __file__, "--measure", file_path, mode],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1_000_000, 10_000_000, 50_000_000]
+    )
+    parser.add_argument("--ascii-max-faces", type=int, default=1_000_000)
+    parser.add_argument("--file", type=str, default=None)
+    parser.add_argument("--measure", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(*args.measure)
+        return
+
+    print(
+        f"{'file':>22} {'MB':>8} {'numpy-stl (s)':>14} {'reader (s)':>11} "
+        f"{'speedup':>8} {'numpy-stl MB':>13} {'reader MB':>10}"
+    )
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        files = [args.file] if args.file else []
+        for size in [] if args.file else args.sizes:
+            files.append(os.path.join(tmp_dir, f"binary-{size}.stl"))
+            write_synthetic_stl(files[-1], size)
+            if size <= args.ascii_max_faces:
+                files.append(os.path.join(tmp_dir, f"ascii-{size}.stl"))
+                stl.mesh.Mesh.from_file(files[-2]).save(files[-1], mode=stl.Mode.ASCII)
+
+        for file_path in files:
+            baseline = run(file_path, "numpy-stl")
+            result = run(file_path, "reader")
+            if not np.array_equal(
+                read_triangles(file_path), stl.mesh.Mesh.from_file(file_path).vectors
+            ):
+                failed = True
+                print(f"ERROR: {file_path} read different vertices")
+            print(
+                f"{os.path.basename(file_path):>22}"
+                f" {os.path.getsize(file_path) / 1e6:8.1f}"
+                f" {baseline['seconds']:14.2f} {result['seconds']:11.2f}"
+                f" {baseline['seconds'] / result['seconds']:7.1f}x"
+                f" {baseline['peak_rss_mb']:13.0f} {result['peak_rss_mb']:10.0f}"
+            )
+            if not args.file:
+                os.remove(file_path)
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
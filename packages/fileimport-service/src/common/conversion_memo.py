@@ -0,0 +1,118 @@
+"""
+Memo of the root object ids sent for converted files, shared by the Python
+importers (the importer scripts add this directory to `sys.path`). A file
+imported again into the same project only needs a new version of the objects
+already on the server, instead of being parsed, converted and sent again.
+"""
+
+import hashlib
+import importlib.metadata
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+import structlog
+
+from import_stats import stage_timer
+
+LOG = structlog.get_logger()
+
+# SQLite database of the memo, shared by the imports on a node, empty disables it
+CONVERSION_MEMO_PATH = os.getenv("CONVERSION_MEMO_PATH", "")
+
+T = TypeVar("T")
+
+
+def conversion_key(
+    server_url: str,
+    project_id: str,
+    file_paths: List[str],
+    importer: str,
+    options: Dict[str, Any],
+) -> str:
+    """
+    Identify a conversion by the content of its input files, the importer with
+    its version and options, and the project its objects were sent to. The
+    specklepy version is part of the importer version.
+    """
+    digest = hashlib.sha256()
+    for file_path in sorted(file_paths):
+        digest.update(os.path.basename(file_path).encode())
+        with open(file_path, "rb") as f:
+            digest.update(hashlib.file_digest(f, "sha256").digest())
+    return json.dumps(
+        [
+            server_url,
+            project_id,
+            digest.hexdigest(),
+            importer,
+            importlib.metadata.version("specklepy"),
+            options,
+        ],
+        sort_keys=True,
+    )
+
+
+class ConversionMemo(object):
+    def __init__(self, path: str):
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        # several imports can run on a node at the same time
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS conversions"
+            " (key TEXT PRIMARY KEY, object_id TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        row = self.connection.execute(
+            "SELECT object_id FROM conversions WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, object_id: str) -> None:
+        self.connection.execute(
+            "INSERT OR REPLACE INTO conversions VALUES (?, ?, ?)",
+            (key, object_id, time.time()),
+        )
+
+    def forget(self, key: str) -> None:
+        self.connection.execute("DELETE FROM conversions WHERE key = ?", (key,))
+
+
+def memoized_send(
+    key: Callable[[], str], send: Callable[[], str], create_version: Callable[[str], T]
+) -> T:
+    """
+    Create a version of the objects sent for the same `key` before, or `send`
+    them and remember their root object id. Falls back to sending if the
+    memoized objects cannot be used anymore, e.g. they were deleted from the
+    server. `key` is only computed if the memo is enabled.
+
+    The IFC importer ships separately and has its own copy of this flow,
+    `ifc_importer.conversion_memo.memoized_convert`, change them together.
+    """
+    if not CONVERSION_MEMO_PATH:
+        return create_version(send())
+
+    memo = ConversionMemo(CONVERSION_MEMO_PATH)
+    with stage_timer.stage("conversion_key"):
+        conversion = key()
+    object_id = memo.get(conversion)
+    if object_id:
+        LOG.info("Reusing the objects of an identical import", object_id=object_id)
+        try:
+            return create_version(object_id)
+        except Exception as ex:
+            # e.g. the objects were deleted from the server
+            LOG.warning(
+                "Could not reuse the objects of an identical import",
+                object_id=object_id,
+                exc_info=ex,
+            )
+            memo.forget(conversion)
+
+    object_id = send()
+    memo.set(conversion, object_id)
+    return create_version(object_id)
@@ -0,0 +1,87 @@
+"""
+Timings and memory use of the stages of an import, shared by the Python importers
+(the importer scripts add this directory to `sys.path`). They are logged as the
+stages end, as structured fields of the importer's log, and written to the results
+JSON for the daemon to export as metrics.
+"""
+
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+import structlog
+
+LOG = structlog.get_logger()
+
+# ru_maxrss is in bytes on macOS, in kilobytes elsewhere
+_MAXRSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of this process so far."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _MAXRSS_UNIT
+
+
+class StageTimer(object):
+    def __init__(self) -> None:
+        self.durations: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time a stage, a stage entered several times adds up."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            self.durations[name] = self.durations.get(name, 0.0) + duration
+            LOG.info(
+                "Import stage finished",
+                stage=name,
+                duration_s=round(duration, 3),
+                peak_rss_mb=round(peak_rss_bytes() / 2**20),
+            )
+
+    def results(self) -> Dict[str, Any]:
+        """The fields added to the results JSON."""
+        return {"stages": self.durations, "peakRssBytes": peak_rss_bytes()}
+
+
+# One import runs per importer process
+stage_timer = StageTimer()
+
+
+class Progress(object):
+    """
+    Reports how many items were processed at most once per `interval` seconds,
+    instead of logging every item.
+    """
+
+    def __init__(
+        self, label: str, total: Optional[int] = None, interval: float = 10.0
+    ) -> None:
+        self.label = label
+        self.total = total
+        self.interval = interval
+        self.count = 0
+        self._start = time.monotonic()
+        self._next_report = self._start + interval
+
+    def advance(self, count: int = 1) -> None:
+        self.count += count
+        now = time.monotonic()
+        if now >= self._next_report:
+            self._next_report = now + self.interval
+            self.report(now)
+
+    def report(self, now: Optional[float] = None) -> None:
+        elapsed = (now or time.monotonic()) - self._start
+        LOG.info(
+            self.label,
+            count=self.count,
+            total=self.total,
+            elapsed_s=round(elapsed, 1),
+            per_s=round(self.count / elapsed if elapsed > 0 else 0.0),
+        )
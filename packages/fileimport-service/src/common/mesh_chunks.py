@@ -0,0 +1,123 @@
+"""
+Splitting of large meshes into spatially coherent chunks, shared by the Python
+importers (the importer scripts add this directory to `sys.path`).
+"""
+
+import os
+from typing import Any, Dict, List
+
+import numpy as np
+
+# Meshes above either budget are split, 0 disables chunking
+MESH_CHUNK_MAX_VERTICES = int(os.getenv("MESH_CHUNK_MAX_VERTICES", "250000"))
+MESH_CHUNK_MAX_FACES = int(os.getenv("MESH_CHUNK_MAX_FACES", "250000"))
+
+_MORTON_BITS = 21
+
+
+def chunk_mesh(
+    mesh: Dict[str, Any],
+    max_vertices: int = MESH_CHUNK_MAX_VERTICES,
+    max_faces: int = MESH_CHUNK_MAX_FACES,
+) -> List[Dict[str, Any]]:
+    """
+    Split a mesh into chunks of at most `max_vertices` vertices and `max_faces`
+    faces. Faces are ordered along a Morton curve through their centroids, which
+    is cut into pieces that are bisected until they fit, so chunks are compact
+    regions of the mesh that can be serialized, uploaded and loaded separately.
+
+    `mesh` holds "vertices" (n, 3), "faces" (flat local indices), "face_offsets"
+    and optionally "vertex_colors" (n, 3) arrays. The chunks are copies of `mesh`
+    with those arrays replaced, meshes within budget are returned as they are.
+    """
+    vertices = mesh["vertices"]
+    faces = mesh["faces"]
+    face_offsets = mesh["face_offsets"]
+    face_count = len(face_offsets) - 1
+    if (not max_vertices or len(vertices) <= max_vertices) and (
+        not max_faces or face_count <= max_faces
+    ):
+        return [mesh]
+
+    face_sizes = np.diff(face_offsets)
+    centroids = np.add.reduceat(vertices[faces], face_offsets[:-1], axis=0)
+    centroids /= face_sizes[:, np.newaxis]
+    faces, face_offsets = gather_faces(
+        faces, face_offsets, np.argsort(_morton_codes(centroids), kind="stable")
+    )
+
+    # Start from as many even pieces as the budgets require, pieces that still
+    # reference too many vertices are bisected
+    pieces = max(
+        -(-len(vertices) // max_vertices) if max_vertices else 1,
+        -(-face_count // max_faces) if max_faces else 1,
+    )
+    bounds = np.linspace(0, face_count, pieces + 1).astype(np.int64).tolist()
+    # Used as a stack, the first piece is on top
+    ranges = list(zip(bounds[:-1], bounds[1:]))[::-1]
+    chunks = []
+    while ranges:
+        start, end = ranges.pop()
+        vertex_ids, local_faces = np.unique(
+            faces[face_offsets[start] : face_offsets[end]], return_inverse=True
+        )
+        too_large = (max_vertices and len(vertex_ids) > max_vertices) or (
+            max_faces and end - start > max_faces
+        )
+        if too_large and end - start > 1:
+            middle = (start + end) // 2
+            # Popped from the end, so the first half is handled first
+            ranges.extend([(middle, end), (start, middle)])
+            continue
+
+        chunk = dict(mesh)
+        chunk["vertices"] = vertices[vertex_ids]
+        chunk["faces"] = local_faces.ravel().astype(np.int32)
+        chunk["face_offsets"] = face_offsets[start : end + 1] - face_offsets[start]
+        if mesh.get("vertex_colors") is not None:
+            chunk["vertex_colors"] = mesh["vertex_colors"][vertex_ids]
+        chunks.append(chunk)
+
+    return chunks
+
+
+def _morton_codes(points: np.ndarray) -> np.ndarray:
+    """Interleave the bits of the points' quantized coordinates."""
+    low = points.min(axis=0)
+    extent = (points.max(axis=0) - low).max()
+    scale = ((1 << _MORTON_BITS) - 1) / extent if extent > 0 else 0
+    quantized = ((points - low) * scale).astype(np.uint64)
+
+    codes = np.zeros(len(points), dtype=np.uint64)
+    for axis in range(3):
+        codes |= _spread_bits(quantized[:, axis]) << np.uint64(axis)
+    return codes
+
+
+def _spread_bits(values: np.ndarray) -> np.ndarray:
+    """Insert two zero bits between each of the lower 21 bits of `values`."""
+    values = values & np.uint64(0x1FFFFF)
+    for shift, mask in (
+        (32, 0x1F00000000FFFF),
+        (16, 0x1F0000FF0000FF),
+        (8, 0x100F00F00F00F00F),
+        (4, 0x10C30C30C30C30C3),
+        (2, 0x1249249249249249),
+    ):
+        values = (values | (values << np.uint64(shift))) & np.uint64(mask)
+    return values
+
+
+def gather_faces(face_indices: np.ndarray, face_offsets: np.ndarray, faces: np.ndarray):
+    """
+    Select (or reorder) `faces` out of flat index/offset arrays, returning new flat
+    arrays.
+    """
+    sizes = face_offsets[faces + 1] - face_offsets[faces]
+    offsets = np.zeros(len(faces) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+    # Position of every selected index in the source array
+    positions = np.arange(offsets[-1], dtype=np.int64) + np.repeat(
+        face_offsets[faces] - offsets[:-1], sizes
+    )
+    return face_indices[positions], offsets
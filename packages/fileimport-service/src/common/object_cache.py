@@ -0,0 +1,136 @@
+"""
+Node-local record of the objects sent to each project, shared by the Python
+importers (the importer scripts add this directory to `sys.path`). Objects the
+server already holds from an earlier import, e.g. materials or repeated meshes,
+are not batched and diffed against the server again.
+"""
+
+import os
+import sqlite3
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+import structlog
+from specklepy.transports.abstract_transport import AbstractTransport
+
+if TYPE_CHECKING:
+    # imported with the client, see server_connection
+    from specklepy.transports.server import ServerTransport
+
+LOG = structlog.get_logger()
+
+# SQLite database of the sent objects, shared by the imports on a node, empty
+# disables it
+OBJECT_CACHE_PATH = os.getenv("OBJECT_CACHE_PATH", "")
+# The least recently sent objects above this count are forgotten
+OBJECT_CACHE_MAX_OBJECTS = int(os.getenv("OBJECT_CACHE_MAX_OBJECTS", "1000000"))
+
+
+class CachedServerTransport(AbstractTransport):
+    """
+    Writes to a `ServerTransport` the objects it has not already sent to the same
+    project. Objects are only recorded as sent once the server transport flushed
+    them without errors.
+    """
+
+    def __init__(
+        self,
+        transport: "ServerTransport",
+        path: str = OBJECT_CACHE_PATH,
+        max_objects: int = OBJECT_CACHE_MAX_OBJECTS,
+    ) -> None:
+        self.transport = transport
+        self.max_objects = max_objects
+        self.scope = f"{transport.url}/{transport.stream_id}"
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        # several imports can run on a node at the same time
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS objects (scope TEXT NOT NULL, id TEXT NOT NULL,"
+            " last_sent REAL NOT NULL, PRIMARY KEY (scope, id)) WITHOUT ROWID"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS objects_last_sent ON objects (last_sent)"
+        )
+        self._sent: List[str] = []
+        self._skipped: List[str] = []
+        self.skipped_bytes = 0
+
+    @property
+    def name(self) -> str:
+        return f"Cached{self.transport.name}"
+
+    def begin_write(self) -> None:
+        self._sent = []
+        self._skipped = []
+        self.skipped_bytes = 0
+        self.transport.begin_write()
+
+    def end_write(self) -> None:
+        self.transport.end_write()
+
+        now = time.time()
+        rows: List[Tuple[str, str, float]] = [
+            (self.scope, id, now) for id in self._sent + self._skipped
+        ]
+        with self.connection:
+            self.connection.execute("BEGIN")
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO objects VALUES (?, ?, ?)", rows
+            )
+            (count,) = self.connection.execute(
+                "SELECT COUNT(*) FROM objects"
+            ).fetchone()
+            if count > self.max_objects:
+                self.connection.execute(
+                    "DELETE FROM objects WHERE (scope, id) IN (SELECT scope, id FROM"
+                    " objects ORDER BY last_sent LIMIT ?)",
+                    (count - self.max_objects,),
+                )
+        # the server would not have stored these again either, what is saved is
+        # batching them and diffing them against the server
+        LOG.info(
+            "Served objects from the local object cache instead of the server diff",
+            objects=len(self._skipped),
+            bytes=self.skipped_bytes,
+        )
+
+    def save_object(self, id: str, serialized_object: str) -> None:
+        if self._was_sent(id):
+            self._skipped.append(id)
+            self.skipped_bytes += len(serialized_object)
+            return
+        self._sent.append(id)
+        self.transport.save_object(id, serialized_object)
+
+    def _was_sent(self, id: str) -> bool:
+        return (
+            self.connection.execute(
+                "SELECT 1 FROM objects WHERE scope = ? AND id = ?", (self.scope, id)
+            ).fetchone()
+            is not None
+        )
+
+    def save_object_from_transport(
+        self, id: str, source_transport: AbstractTransport
+    ) -> None:
+        if not self._was_sent(id):
+            self.transport.save_object_from_transport(id, source_transport)
+
+    def get_object(self, id: str) -> Optional[str]:
+        return self.transport.get_object(id)
+
+    def has_objects(self, id_list: List[str]) -> Dict[str, bool]:
+        return {id: self._was_sent(id) for id in id_list}
+
+    def copy_object_and_children(
+        self, id: str, target_transport: AbstractTransport
+    ) -> str:
+        return self.transport.copy_object_and_children(id, target_transport)
+
+
+def with_object_cache(transport: "ServerTransport") -> AbstractTransport:
+    """Wrap `transport` in a `CachedServerTransport` if the cache is enabled."""
+    if not OBJECT_CACHE_PATH:
+        return transport
+    return CachedServerTransport(transport)
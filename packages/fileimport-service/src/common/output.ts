@@ -23,3 +23,36 @@ export function isErrorOutput(
     !!maybeErrorOutput.error
   )
 }
+
+export type ImportStats = {
+  stages: Record<string, number>
+  peakRssBytes: number | null
+}
+
+/**
+ * Stage durations (in seconds) and peak memory use reported by the Python importers,
+ * next to the success or error fields
+ */
+export function getImportStats(maybeOutputWithStats: unknown): ImportStats | null {
+  if (
+    !maybeOutputWithStats ||
+    typeof maybeOutputWithStats !== 'object' ||
+    !('stages' in maybeOutputWithStats) ||
+    !maybeOutputWithStats.stages ||
+    typeof maybeOutputWithStats.stages !== 'object'
+  )
+    return null
+
+  const stages = Object.fromEntries(
+    Object.entries(maybeOutputWithStats.stages).filter(
+      (entry): entry is [string, number] =>
+        typeof entry[1] === 'number' && isFinite(entry[1])
+    )
+  )
+  const peakRssBytes =
+    'peakRssBytes' in maybeOutputWithStats &&
+    typeof maybeOutputWithStats.peakRssBytes === 'number'
+      ? maybeOutputWithStats.peakRssBytes
+      : null
+  return { stages, peakRssBytes }
+}
@@ -0,0 +1,101 @@
+"""
+Connection of the Python importers to the Speckle server, shared by the importers
+(the importer scripts add this directory to `sys.path`). specklepy's GraphQL client
+and server transport take most of the start up time of an importer, so they are
+imported, authenticated and the model looked up in a background thread while the
+importer parses and converts the file.
+"""
+
+import os
+import threading
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Optional, Tuple
+
+from specklepy.transports.abstract_transport import AbstractTransport
+
+from import_stats import stage_timer
+from object_cache import with_object_cache
+
+if TYPE_CHECKING:
+    from specklepy.api.client import SpeckleClient
+    from specklepy.core.api.models import Model, Version
+
+
+class ServerConnection(object):
+    def __init__(
+        self,
+        server_url: str,
+        project_id: str,
+        model_id: Optional[str],
+        branch_name: str,
+    ) -> None:
+        self.server_url = server_url
+        self.project_id = project_id
+        token = os.environ["USER_TOKEN"]
+        if not token:
+            raise Exception('Expected an env var "USER_TOKEN"')
+
+        self._connected: "Future[Tuple[SpeckleClient, Model]]" = Future()
+        # a daemon, so an import failing first does not wait for the server
+        threading.Thread(
+            target=self._connect, args=(token, model_id, branch_name), daemon=True
+        ).start()
+
+    def _connect(self, token: str, model_id: Optional[str], branch_name: str) -> None:
+        try:
+            with stage_timer.stage("connect"):
+                # Everything the importers use of the client stack is imported
+                # here, the importer thread only uses it once connected
+                from specklepy.api import operations  # noqa: F401
+                from specklepy.api.client import SpeckleClient
+                from specklepy.core.api.inputs import CreateModelInput
+                from specklepy.transports.server import ServerTransport  # noqa: F401
+
+                client = SpeckleClient(host=self.server_url, use_ssl=False)
+                client.authenticate_with_token(token)
+
+                if model_id:
+                    model = client.model.get(model_id, self.project_id)
+                else:
+                    model = client.model.create(
+                        CreateModelInput(
+                            name=branch_name,
+                            description="File upload branch"
+                            if branch_name == "uploads"
+                            else "",
+                            project_id=self.project_id,
+                        ),
+                    )
+            self._connected.set_result((client, model))
+        except BaseException as ex:
+            self._connected.set_exception(ex)
+
+    def connect(self) -> Tuple["SpeckleClient", "Model"]:
+        """The authenticated client and the model, waits until they are ready."""
+        return self._connected.result()
+
+    def transport(self) -> AbstractTransport:
+        """A transport sending to the project, see `with_object_cache`."""
+        client, _ = self.connect()
+        from specklepy.transports.server import ServerTransport
+
+        return with_object_cache(
+            ServerTransport(client=client, stream_id=self.project_id)
+        )
+
+    def create_version(
+        self, object_id: str, message: str, source_application: str
+    ) -> "Version":
+        client, model = self.connect()
+        from specklepy.core.api.inputs import CreateVersionInput
+
+        with stage_timer.stage("create_version"):
+            return client.version.create(
+                CreateVersionInput(
+                    project_id=self.project_id,
+                    object_id=object_id,
+                    model_id=model.id,
+                    message=message,
+                    source_application=source_application,
+                )
+            )
@@ -2,7 +2,9 @@ import {
   initPrometheusMetrics,
   metricDuration,
   metricInputFileSize,
-  metricOperationErrors
+  metricOperationErrors,
+  metricPeakMemory,
+  metricStageDuration
 } from '@/controller/prometheusMetrics.js'
 import { DbClient, getDbClients } from '@/clients/knex.js'
 import { downloadFile } from '@/controller/filesApi.js'
@@ -13,7 +15,7 @@ import { logger } from '@/observability/logging.js'
 import { Nullable, Scopes, wait, TIME_MS } from '@speckle/shared'
 import { Knex } from 'knex'
 import { getIfcDllPath, isProdEnv } from '@/controller/helpers/env.js'
-import { isErrorOutput, isSuccessOutput } from '@/common/output.js'
+import { getImportStats, isErrorOutput, isSuccessOutput } from '@/common/output.js'
 import { runProcessWithTimeout } from '@/common/processHandling.js'
 import {
   getConnectionSettings,
@@ -300,6 +302,16 @@ async function doTask(
 
     const output: unknown = JSON.parse(fs.readFileSync(TMP_RESULTS_PATH, 'utf8'))
 
+    const importStats = getImportStats(output)
+    if (importStats) {
+      taskLogger.info(importStats, 'Importer reported its stage durations')
+      for (const [stage, seconds] of Object.entries(importStats.stages)) {
+        metricStageDuration.labels(fileTypeForMetric, stage).observe(seconds)
+      }
+      if (importStats.peakRssBytes !== null)
+        metricPeakMemory.labels(fileTypeForMetric).observe(importStats.peakRssBytes)
+    }
+
     if (!isSuccessOutput(output)) {
       throw new Error(isErrorOutput(output) ? output.error : 'Unknown error')
     }
@@ -170,3 +170,25 @@ export const metricInputFileSize = new prometheusClient.Histogram({
   ],
   labelNames: ['op']
 })
+
+export const metricStageDuration = new prometheusClient.Histogram({
+  name: 'speckle_server_operation_stage_duration',
+  help: 'Durations in seconds of the stages of an operation, reported by the importer',
+  buckets: [0.1, 0.5, 1, 5, 10, 30, 60, 300, 600, 900],
+  labelNames: ['op', 'stage']
+})
+
+export const metricPeakMemory = new prometheusClient.Histogram({
+  name: 'speckle_server_operation_peak_memory',
+  help: 'Peak resident memory in bytes of the importer process of an operation',
+  buckets: [
+    100 * 1000 * 1000,
+    250 * 1000 * 1000,
+    500 * 1000 * 1000,
+    1000 * 1000 * 1000,
+    2000 * 1000 * 1000,
+    4000 * 1000 * 1000,
+    8000 * 1000 * 1000
+  ],
+  labelNames: ['op']
+})
@@ -1,60 +1,107 @@
 import sys
 import os
 import json
-from typing import Any, Dict, List, Optional
+import hashlib
+from collections import Counter
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Set
+import numpy as np
 from specklepy.objects.models.collections.collection import Collection
 from specklepy.objects.base import Base
 from specklepy.objects.other import RenderMaterial
+from specklepy.objects.proxies import (
+    InstanceDefinitionProxy,
+    InstanceProxy,
+    RenderMaterialProxy,
+)
 from specklepy.objects.geometry import Mesh
-from specklepy.transports.server import ServerTransport
-from specklepy.api.client import SpeckleClient
+from specklepy.transports.abstract_transport import AbstractTransport
 from specklepy.objects.models.units import Units
 from specklepy.objects.data_objects import DataObject
-from specklepy.api import operations
-from specklepy.core.api.inputs import CreateModelInput, CreateVersionInput
-from specklepy.core.api.models import Version
-from obj_file import ObjFile
+
+sys.path.insert(
+    1, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common")
+)
+from obj_file import ObjFile  # noqa: E402
+from streaming_sender import StreamingSender  # noqa: E402
+from mesh_chunks import (  # noqa: E402
+    MESH_CHUNK_MAX_FACES,
+    MESH_CHUNK_MAX_VERTICES,
+    chunk_mesh,
+)
+from conversion_memo import conversion_key, memoized_send  # noqa: E402
+from import_stats import Progress, stage_timer  # noqa: E402
+from server_connection import ServerConnection  # noqa: E402
 
 import structlog
 from logging import INFO, basicConfig
 
-basicConfig(format="%(message)s", stream=sys.stdout, level=INFO)
-
-structlog.configure(
-    processors=[
-        structlog.stdlib.filter_by_level,
-        structlog.contextvars.merge_contextvars,
-        structlog.processors.add_log_level,
-        structlog.processors.StackInfoRenderer(),
-        structlog.processors.format_exc_info,
-        structlog.processors.TimeStamper(fmt="iso"),
-        structlog.stdlib.PositionalArgumentsFormatter(),
-        structlog.processors.UnicodeDecoder(),
-        structlog.processors.CallsiteParameterAdder(
-            {
-                structlog.processors.CallsiteParameter.FILENAME,
-                structlog.processors.CallsiteParameter.FUNC_NAME,
-                structlog.processors.CallsiteParameter.LINENO,
-            }
-        ),
-        structlog.processors.JSONRenderer(),
-    ],
-    wrapper_class=structlog.make_filtering_bound_logger(INFO),
-    logger_factory=structlog.stdlib.LoggerFactory(),
-    cache_logger_on_first_use=True,
-)
+if TYPE_CHECKING:
+    from specklepy.core.api.models import Version
+
 LOG = structlog.get_logger()
 DEFAULT_BRANCH = "uploads"
+# Part of the key of memoized conversions, bump it when the converted objects change
+CONVERSION_VERSION = 3
+
+# "lines" (default) parses line by line, "vectorized" tokenizes whole chunks with numpy,
+# "parallel" does so for byte ranges of the file in a pool of OBJ_PARSER_PROCESSES
+# and "streaming" also converts and sends every object as soon as it is parsed
+OBJ_PARSER_MODE = os.getenv("OBJ_PARSER_MODE", "lines")
+OBJ_PARSER_PROCESSES = (
+    int(os.getenv("OBJ_PARSER_PROCESSES", "0")) or os.cpu_count() or 1
+)
+
+
+def configure_logging() -> None:
+    """JSON logs to stdout, only configured when run as a script."""
+    basicConfig(format="%(message)s", stream=sys.stdout, level=INFO)
+
+    structlog.configure(
+        processors=[
+            structlog.stdlib.filter_by_level,
+            structlog.contextvars.merge_contextvars,
+            structlog.processors.add_log_level,
+            structlog.processors.StackInfoRenderer(),
+            structlog.processors.format_exc_info,
+            structlog.processors.TimeStamper(fmt="iso"),
+            structlog.stdlib.PositionalArgumentsFormatter(),
+            structlog.processors.UnicodeDecoder(),
+            structlog.processors.CallsiteParameterAdder(
+                {
+                    structlog.processors.CallsiteParameter.FILENAME,
+                    structlog.processors.CallsiteParameter.FUNC_NAME,
+                    structlog.processors.CallsiteParameter.LINENO,
+                }
+            ),
+            structlog.processors.JSONRenderer(),
+        ],
+        wrapper_class=structlog.make_filtering_bound_logger(INFO),
+        logger_factory=structlog.stdlib.LoggerFactory(),
+        cache_logger_on_first_use=True,
+    )
+
+
+def pack_argb(colors: np.ndarray) -> np.ndarray:
+    """
+    Pack (n, 3) RGB colors into opaque ARGB colors, as the signed 32 bit ints
+    Speckle stores. Channels are clamped to [0, 1], so an out of range channel
+    cannot spill into its neighbours, then truncated like `int(val * 255)`.
+    """
+    channels = (np.clip(np.asarray(colors, dtype=np.float64), 0.0, 1.0) * 255).astype(
+        np.uint32
+    )
+    argb = (
+        np.uint32(0xFF000000)
+        | channels[:, 0] << 16
+        | channels[:, 1] << 8
+        | channels[:, 2]
+    )
+    return argb.view(np.int32)
 
 
 def convert_material(obj_mat: Dict[str, Any]) -> RenderMaterial:
     if "diffuse" in obj_mat:
-        argb = [
-            1,
-        ] + obj_mat["diffuse"]
-        diffuse = int.from_bytes(
-            [int(val * 255) for val in argb], byteorder="big", signed=True
-        )
+        diffuse = int(pack_argb([obj_mat["diffuse"]])[0])
     else:
         diffuse = 0
 
@@ -71,113 +118,330 @@ def convert_material(obj_mat: Dict[str, Any]) -> RenderMaterial:
     )
 
 
-def convert_objects(objects: Dict[str, List[Dict[str, Any]]]) -> Collection:
-    converted_objects: List[Base] = []
+def convert_mesh(obj_mesh: Dict[str, Any]) -> Mesh:
+    speckle_vertices = obj_mesh["vertices"].ravel().tolist()
+    # Speckle faces are prefixed by their vertex count: [n, i1, ..., in, m, ...]
+    face_offsets = obj_mesh["face_offsets"]
+    speckle_faces = np.insert(
+        obj_mesh["faces"], face_offsets[:-1], np.diff(face_offsets)
+    ).tolist()
 
-    for objname in objects:
-        objLogger = LOG.bind(object_name=objname)
-        objLogger.info("Converting object")
+    colors = []
+    if obj_mesh["vertex_colors"] is not None:
+        colors = pack_argb(obj_mesh["vertex_colors"]).tolist()
 
+    return Mesh(
+        vertices=speckle_vertices,
+        faces=speckle_faces,
+        colors=colors,
+        textureCoordinates=[],
+        units=Units.none,
+    )
+
+
+class ObjConverter(object):
+    """
+    Converts the parsed objects of a file. Every distinct material is built once
+    and assigned through a `RenderMaterialProxy`. Mesh geometry repeated across
+    objects (up to a translation) is sent once as an instance definition, and its
+    uses are `InstanceProxy`s. Geometry used once stays a plain mesh, and
+    `finish()` only adds the instance definitions when there are some.
+
+    `repeated_geometry` holds the geometry keys known to repeat. When it is None,
+    as the objects are converted while they are parsed, geometry is instanced from
+    its second use on.
+    """
+
+    def __init__(
+        self,
+        total: Optional[int] = None,
+        repeated_geometry: Optional[Set[bytes]] = None,
+    ) -> None:
+        self.material_proxies: Dict[str, RenderMaterialProxy] = {}
+        self.repeated_geometry = repeated_geometry
+        self.seen_geometry: Set[bytes] = set()
+        self.definition_ids: Dict[bytes, str] = {}
+        self.definition_proxies: List[InstanceDefinitionProxy] = []
+        self.definition_geometry: List[Base] = []
+        self.mesh_count = 0
+        self.progress = Progress("Converted objects", total)
+
+    def convert_object(
+        self,
+        objname: str,
+        obj_meshes: List[Dict[str, Any]],
+        geometry_keys: Optional[List[bytes]] = None,
+    ) -> DataObject:
         display_values: List[Base] = []
 
-        for obj_mesh in objects[objname]:
-            speckle_vertices = [
-                coord for point in obj_mesh["vertices"] for coord in point
-            ]
-            speckle_faces = []
-            for obj_face in obj_mesh["faces"]:
-                speckle_faces.append(len(obj_face))
-                speckle_faces.extend(obj_face)
-
-            has_vertex_colors = False
-            for vc in obj_mesh["vertex_colors"]:
-                if vc is not None:
-                    has_vertex_colors = True
-            colors = []
-            if has_vertex_colors:
-                for vc in obj_mesh["vertex_colors"]:
-                    if vc is None:
-                        r, g, b = (1.0, 1.0, 1.0)
-                    else:
-                        r, g, b = vc
-                    argb = (1.0, r, g, b)
-                    color = int.from_bytes(
-                        [int(val * 255) for val in argb], byteorder="big", signed=True
+        for i, obj_mesh in enumerate(obj_meshes):
+            geometry_key = (
+                geometry_keys[i] if geometry_keys else _geometry_key(obj_mesh)
+            )
+            repeated = self.is_repeated(geometry_key)
+            # Large meshes are split into several display values
+            for chunk in chunk_mesh(obj_mesh):
+                if not repeated:
+                    display_values.append(self.convert_display_mesh(chunk))
+                else:
+                    display_values.append(
+                        self.convert_instance(
+                            chunk,
+                            geometry_key if chunk is obj_mesh else _geometry_key(chunk),
+                        )
                     )
-                    colors.append(color)
-
-            speckle_mesh = Mesh(
-                vertices=speckle_vertices,
-                faces=speckle_faces,
-                colors=colors,
-                textureCoordinates=[],
-                units=Units.none,
+
+        self.progress.advance()
+        return DataObject(name=objname, displayValue=display_values, properties={})
+
+    def is_repeated(self, geometry_key: bytes) -> bool:
+        if self.repeated_geometry is not None:
+            return geometry_key in self.repeated_geometry
+        repeated = geometry_key in self.seen_geometry
+        self.seen_geometry.add(geometry_key)
+        return repeated
+
+    def convert_display_mesh(self, obj_mesh: Dict[str, Any]) -> Mesh:
+        self.mesh_count += 1
+        speckle_mesh = convert_mesh(obj_mesh)
+        speckle_mesh.applicationId = f"mesh:{self.mesh_count}"
+        self.assign_material(obj_mesh["material"], speckle_mesh.applicationId)
+        return speckle_mesh
+
+    def convert_instance(
+        self, obj_mesh: Dict[str, Any], geometry_key: bytes
+    ) -> InstanceProxy:
+        self.mesh_count += 1
+        application_id = f"mesh:{self.mesh_count}"
+        origin = _origin(obj_mesh["vertices"])
+
+        definition_id = self.definition_ids.get(geometry_key)
+        if definition_id is None:
+            # The definition holds the geometry moved to the origin
+            definition_id = f"definition:{application_id}"
+            self.definition_ids[geometry_key] = definition_id
+            definition_mesh = convert_mesh(
+                {**obj_mesh, "vertices": obj_mesh["vertices"] - origin}
+            )
+            definition_mesh.applicationId = f"geometry:{application_id}"
+            self.assign_material(obj_mesh["material"], definition_mesh.applicationId)
+            self.definition_geometry.append(definition_mesh)
+            self.definition_proxies.append(
+                InstanceDefinitionProxy(
+                    applicationId=definition_id,
+                    name=definition_id,
+                    objects=[definition_mesh.applicationId],
+                    max_depth=0,
+                )
             )
 
-            obj_material = obj_mesh["material"]
-            if obj_material:
-                speckle_mesh["renderMaterial"] = convert_material(obj_material)
+        return _translated_instance(application_id, definition_id, origin)
 
-            display_values.append(speckle_mesh)
+    def assign_material(
+        self, obj_material: Optional[Dict[str, Any]], application_id: str
+    ) -> None:
+        if not obj_material:
+            return
+        proxy = self.material_proxies.get(obj_material["name"])
+        if proxy is None:
+            render_material = convert_material(obj_material)
+            render_material.applicationId = f"material:{obj_material['name']}"
+            proxy = RenderMaterialProxy(objects=[], value=render_material)
+            self.material_proxies[obj_material["name"]] = proxy
+        proxy.objects.append(application_id)
 
-        speckle_obj = DataObject(
-            name=objname, displayValue=display_values, properties={}
+    def finish(self, root: Collection) -> Collection:
+        root["renderMaterialProxies"] = list(self.material_proxies.values())
+        if self.definition_proxies:
+            root["instanceDefinitionProxies"] = self.definition_proxies
+            root.elements.append(
+                Collection(name="definitionGeometry", elements=self.definition_geometry)
+            )
+        LOG.info(
+            "Converted %s objects, %s meshes with %s materials, %s repeated geometries"
+            " instanced",
+            self.progress.count,
+            self.mesh_count,
+            len(self.material_proxies),
+            len(self.definition_proxies),
         )
-        converted_objects.append(speckle_obj)
+        return root
 
-    return Collection(name=os.path.basename(file_path), elements=converted_objects)
 
+def _origin(vertices: np.ndarray) -> np.ndarray:
+    """The point a mesh is translated by from its instance definition."""
+    return vertices[0] if len(vertices) else np.zeros(3)
 
-def import_obj(
-    file_path: str,
-    project_id: str,
-    model_id: Optional[str],
-    branch_name: str,
-    commit_message: str,
-) -> Version:
-    # Parse input
-    obj = ObjFile(file_path)
-    LOG.info(
-        "Parsed obj with %s faces (%s vertices)", len(obj.faces), len(obj.vertices) * 3
+
+def _geometry_key(obj_mesh: Dict[str, Any]) -> bytes:
+    """Identifies the geometry and material of a mesh, up to a translation."""
+    digest = hashlib.blake2b(digest_size=16)
+    material = obj_mesh["material"]
+    digest.update((material["name"] if material else "").encode())
+    for array in (
+        obj_mesh["vertices"] - _origin(obj_mesh["vertices"]),
+        obj_mesh["faces"],
+        obj_mesh["face_offsets"],
+    ):
+        digest.update(str(array.shape).encode())
+        digest.update(np.ascontiguousarray(array).tobytes())
+    if obj_mesh["vertex_colors"] is not None:
+        digest.update(np.ascontiguousarray(obj_mesh["vertex_colors"]).tobytes())
+    return digest.digest()
+
+
+def _translated_instance(
+    application_id: str, definition_id: str, origin: np.ndarray
+) -> InstanceProxy:
+    x, y, z = origin.tolist()
+    instance = InstanceProxy(
+        applicationId=application_id,
+        definition_id=definition_id,
+        # Row major
+        transform=[1, 0, 0, x, 0, 1, 0, y, 0, 0, 1, z, 0, 0, 0, 1],
+        max_depth=0,
+        units=Units.none,
     )
+    _set_definition_id(instance, definition_id)
+    return instance
 
-    speckle_root = convert_objects(obj.objects)
 
-    # Commit
+def _set_definition_id(instance: InstanceProxy, definition_id: str) -> None:
+    """
+    specklepy 3.0.1 (pinned in requirements.txt) serializes
+    `InstanceProxy.definition_id` under that name, while the viewer and the other
+    connectors read `definitionId`. Drop this once specklepy serializes it as
+    `definitionId`.
+    """
+    instance["definitionId"] = definition_id
+
 
-    client = SpeckleClient(
-        host=os.getenv("SPECKLE_SERVER_URL", "127.0.0.1:3000"), use_ssl=False
+def convert_objects(
+    objects: Dict[str, List[Dict[str, Any]]], collection_name: str
+) -> Collection:
+    # Only geometry used more than once is instanced, the keys are kept so every
+    # mesh is hashed once
+    geometry_keys = {
+        objname: [_geometry_key(obj_mesh) for obj_mesh in obj_meshes]
+        for objname, obj_meshes in objects.items()
+    }
+    uses = Counter(key for keys in geometry_keys.values() for key in keys)
+    converter = ObjConverter(
+        len(objects), {key for key, count in uses.items() if count > 1}
     )
-    token = os.environ["USER_TOKEN"]
-    if not token:
-        raise Exception('Expected an env var "USER_TOKEN"')
-    client.authenticate_with_token(token)
+    converted_objects: List[Base] = []
 
-    if model_id:
-        model = client.model.get(model_id, project_id)
-    else:
-        model_create_input = CreateModelInput(
-            name=branch_name,
-            description="File upload branch" if branch_name == "uploads" else "",
-            project_id=project_id,
+    for objname in objects:
+        converted_objects.append(
+            converter.convert_object(objname, objects[objname], geometry_keys[objname])
         )
-        model = client.model.create(model_create_input)
 
-    transport = ServerTransport(client=client, stream_id=project_id)
-    id = operations.send(
-        base=speckle_root, transports=[transport], use_default_cache=False
+    return converter.finish(
+        Collection(name=collection_name, elements=converted_objects)
     )
 
-    create_commit = CreateVersionInput(
-        object_id=id,
-        model_id=model.id,
-        project_id=project_id,
-        message=(commit_message or "OBJ file upload"),
-        source_application="OBJ",
+
+def send_streaming(file_path: str, transport: AbstractTransport) -> str:
+    """
+    Parse, convert and send the file one object at a time: every object is handed
+    to the transport (which uploads in the background) as soon as the parser is done
+    with it, so memory scales with the largest object instead of the whole file.
+    """
+    sender = StreamingSender([transport])
+    elements: List[Base] = []
+
+    converter = ObjConverter()
+
+    def on_object(objname: str, obj_meshes: List[Dict[str, Any]]) -> None:
+        elements.append(sender.send(converter.convert_object(objname, obj_meshes)))
+
+    with stage_timer.stage("stream"):
+        obj = ObjFile(file_path, on_object=on_object)
+    LOG.info(
+        "Parsed and sent obj with %s objects, %s faces (%s vertices)",
+        len(elements),
+        obj.face_count,
+        obj.vertex_count * 3,
     )
-    version = client.version.create(create_commit)
 
-    return version
+    with stage_timer.stage("send"):
+        return sender.finish(
+            converter.finish(
+                Collection(name=os.path.basename(file_path), elements=elements)
+            )
+        )
+
+
+def send_obj(file_path: str, transport: Callable[[], AbstractTransport]) -> str:
+    """
+    Parse, convert and send an OBJ file, returns the id of the root object.
+    `transport` is called once the file is converted, or before parsing it in
+    streaming mode.
+    """
+    if OBJ_PARSER_MODE == "streaming":
+        return send_streaming(file_path, transport())
+
+    # Parse input
+    with stage_timer.stage("parse"):
+        obj = ObjFile(
+            file_path,
+            # parallel mode with a single process is the vectorized parser
+            vectorized=OBJ_PARSER_MODE in ("vectorized", "parallel"),
+            processes=OBJ_PARSER_PROCESSES if OBJ_PARSER_MODE == "parallel" else 1,
+            defer_post_process=True,
+        )
+    LOG.info(
+        "Parsed obj with %s faces (%s vertices)",
+        obj.face_count,
+        obj.vertex_count * 3,
+    )
+    with stage_timer.stage("post_process"):
+        obj.post_process()
+
+    with stage_timer.stage("convert"):
+        speckle_root = convert_objects(obj.objects, os.path.basename(file_path))
+
+    # Commit
+    target = transport()
+    from specklepy.api import operations
+
+    with stage_timer.stage("send"):
+        return operations.send(
+            base=speckle_root, transports=[target], use_default_cache=False
+        )
+
+
+def import_obj(
+    file_path: str,
+    project_id: str,
+    model_id: Optional[str],
+    branch_name: str,
+    commit_message: str,
+) -> "Version":
+    server_url = os.getenv("SPECKLE_SERVER_URL", "127.0.0.1:3000")
+    # connects while the file is parsed and converted
+    connection = ServerConnection(server_url, project_id, model_id, branch_name)
+
+    # the MTL files downloaded next to the OBJ file are part of its content
+    input_dir = os.path.dirname(file_path)
+    return memoized_send(
+        lambda: conversion_key(
+            server_url,
+            project_id,
+            [os.path.join(input_dir, name) for name in os.listdir(input_dir)],
+            f"obj@{CONVERSION_VERSION}",
+            {
+                "name": os.path.basename(file_path),
+                "parser_mode": OBJ_PARSER_MODE,
+                "max_vertices": MESH_CHUNK_MAX_VERTICES,
+                "max_faces": MESH_CHUNK_MAX_FACES,
+            },
+        ),
+        lambda: send_obj(file_path, connection.transport),
+        lambda object_id: connection.create_version(
+            object_id, commit_message or "OBJ file upload", "OBJ"
+        ),
+    )
 
 
 if __name__ == "__main__":
@@ -194,6 +458,7 @@ if __name__ == "__main__":
         model_id,
         _,
     ) = sys.argv[1:]
+    configure_logging()
     try:
         LOG.info("ImportOBJ argv[1:]:%s", sys.argv[1:])
         version = import_obj(
@@ -203,5 +468,6 @@ if __name__ == "__main__":
     except Exception as ex:
         LOG.exception(ex)
         results = {"success": False, "error": str(ex)}
+    results.update(stage_timer.results())
 
     Path(tmp_results_path).write_text(json.dumps(results))
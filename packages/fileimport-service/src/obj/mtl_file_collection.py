@@ -2,6 +2,8 @@ import os
 
 import structlog
 
+from obj_array_parser import map_file
+
 LOG = structlog.get_logger()
 
 
@@ -27,55 +29,56 @@ class MtlFileCollection(object):
             LOG.error("Missing MTL file:%s", fpath)
             return
 
-        with open(fpath, "r") as f:
-            while True:
-                line = f.readline()
-                if not line:
-                    break
-                if not line.strip() or line.startswith("#"):
+        # Lines are read as bytes out of a memory map, only names are decoded,
+        # `float` and `int` parse bytes directly
+        mapped = map_file(fpath)
+        if mapped is not None:
+            for line in iter(mapped.readline, b""):
+                if not line.strip() or line.startswith(b"#"):
                     continue
-                parts = line.strip().split(" ")
-                if parts[0] == "newmtl":
-                    mat_name = " ".join(parts[1:])
+                parts = line.strip().split(b" ")
+                directive = parts[0].decode("utf-8", errors="replace")
+                if directive == "newmtl":
+                    mat_name = b" ".join(parts[1:]).decode("utf-8", errors="replace")
                     self.crt_mat = {"name": mat_name}
                     self.materials[mat_name] = self.crt_mat
-                elif parts[0] == "Ka":
+                elif directive == "Ka":
                     if self.ensure_mat("Ka"):
                         self.crt_mat["ambient"] = [float(x) for x in parts[1:]]
-                elif parts[0] == "Kd":
+                elif directive == "Kd":
                     if self.ensure_mat("Kd"):
                         self.crt_mat["diffuse"] = [float(x) for x in parts[1:]]
-                elif parts[0] == "Ks":
+                elif directive == "Ks":
                     if self.ensure_mat("Ks"):
                         self.crt_mat["specular_color"] = [float(x) for x in parts[1:]]
-                elif parts[0] == "Ns":
+                elif directive == "Ns":
                     if self.ensure_mat("Ns"):
                         self.crt_mat["specular_exponent"] = float(parts[1])
-                elif parts[0] == "d":
+                elif directive == "d":
                     if self.ensure_mat("d"):
                         self.crt_mat["dissolved"] = float(parts[1])
-                elif parts[0] == "Tr":
+                elif directive == "Tr":
                     if self.ensure_mat("Tr"):
                         self.crt_mat["dissolved"] = 1.0 - float(parts[1])
-                elif parts[0] == "Ni":
+                elif directive == "Ni":
                     if self.ensure_mat("Ni"):
                         self.crt_mat["refraction_index"] = float(parts[1])
-                elif parts[0] == "illum":
+                elif directive == "illum":
                     if self.ensure_mat("illum"):
                         self.crt_mat["illumination_mode"] = int(parts[1])
-                elif parts[0] == "Pr":
+                elif directive == "Pr":
                     if self.ensure_mat("Pr"):
                         self.crt_mat["roughness"] = float(parts[1])
-                elif parts[0] == "Pm":
+                elif directive == "Pm":
                     if self.ensure_mat("Pm"):
                         self.crt_mat["metallic"] = float(parts[1])
-                elif parts[0] == "Ke":
+                elif directive == "Ke":
                     if self.ensure_mat("Ke"):
                         self.crt_mat["emissive"] = [float(x) for x in parts[1:]]
                 else:
-                    if parts[0] not in self.logged_unsupported:
-                        LOG.warn("Unsupported MTL directive: %s", parts[0])
-                        self.logged_unsupported.add(parts[0])
+                    if directive not in self.logged_unsupported:
+                        LOG.warn("Unsupported MTL directive: %s", directive)
+                        self.logged_unsupported.add(directive)
         self.crt_mat = None
 
     def get_material(self, name):
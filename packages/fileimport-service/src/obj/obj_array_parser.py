@@ -0,0 +1,525 @@
+import mmap
+import os
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+# shared with the STL importer, the importers add `common` to `sys.path`
+from mesh_chunks import gather_faces
+
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+
+_NL = ord("\n")
+_CR = ord("\r")
+_TAB = ord("\t")
+_SPACE = ord(" ")
+_HASH = ord("#")
+_SLASH = ord("/")
+
+# Upper bound of vertex ids, used to key vertex ids by group in `split_faces`
+_MAX_VERTEX_ID = 1 << 32
+
+# Line kinds
+_SKIP = 0
+_VERTEX = 1
+_FACE = 2
+_VERTEX_DATA = 3  # vt / vn / vp: not imported, but too frequent to dispatch one by one
+_OTHER = 4
+
+
+class ObjArrayParser(object):
+    """
+    Tokenizes OBJ data one chunk at a time into contiguous numpy arrays.
+
+    `v` and `f` lines are classified and converted in bulk. Every other directive is
+    passed, in file order, to `on_directive(parts)`, which must return the current
+    (object name, material name) state applied to the faces that follow it.
+
+    If `on_object_faces(object_name, face_indices, face_offsets, face_materials)` is
+    given, the faces of every object are handed over as soon as a following `o`
+    directive ends it, and are not kept by the parser. Vertices are always kept since
+    faces may reference any previously declared vertex.
+
+    Vertices parsed so far are always available, faces after `finish()`:
+      - `vertices`: float64 (n, 3), stored as (x, z, y) like `ObjFile.on_v`
+      - `vertex_colors`: float64 (n, 3), only meaningful where `has_color` is set
+      - `face_indices`: int32, 0-based global vertex indices of all faces
+      - `face_offsets`: int64 (faces + 1), face i is face_indices[offsets[i]:offsets[i+1]]
+      - `face_objects` / `face_materials`: int32 ids into `object_names` / `material_names`
+    """
+
+    def __init__(
+        self,
+        on_directive: Callable[[List[str]], Tuple[str, str]],
+        initial_state: Tuple[str, str] = ("", ""),
+        on_object_faces: Optional[
+            Callable[[str, np.ndarray, np.ndarray, np.ndarray], None]
+        ] = None,
+    ) -> None:
+        self.on_directive = on_directive
+        self.on_object_faces = on_object_faces
+
+        self.object_names: List[str] = []
+        self.material_names: List[str] = []
+        self._object_ids = {}
+        self._material_ids = {}
+        self._crt_object = self.object_id(initial_state[0])
+        self._crt_material = self.material_id(initial_state[1])
+        self._change_lines: List[int] = []
+        self._change_objects: List[int] = []
+        self._change_materials: List[int] = []
+
+        self.vertex_count = 0
+        self.face_count = 0
+        self._pending = b""
+
+        self._vertices = _GrowableArray((3,), np.float64)
+        self._vertex_colors = _GrowableArray((3,), np.float64)
+        self._has_color = _GrowableArray((), np.bool_)
+        self._face_indices: List[np.ndarray] = []
+        self._face_sizes: List[np.ndarray] = []
+        self._face_objects: List[np.ndarray] = []
+        self._face_materials: List[np.ndarray] = []
+
+        self.face_indices: Optional[np.ndarray] = None
+        self.face_offsets: Optional[np.ndarray] = None
+        self.face_objects: Optional[np.ndarray] = None
+        self.face_materials: Optional[np.ndarray] = None
+
+    @property
+    def vertices(self) -> np.ndarray:
+        return self._vertices.data
+
+    @property
+    def vertex_colors(self) -> np.ndarray:
+        return self._vertex_colors.data
+
+    @property
+    def has_color(self) -> np.ndarray:
+        return self._has_color.data
+
+    def parse_file(
+        self,
+        file_path: str,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        start: int = 0,
+        end: Optional[int] = None,
+    ) -> None:
+        """
+        Parse the lines of the file in [start, end) straight out of a read-only
+        memory map, one chunk of complete lines at a time, without copying or
+        decoding the file. A range must start at the beginning of a line.
+        """
+        mapped = map_file(file_path)
+        if mapped is not None:
+            end = len(mapped) if end is None else end
+            while start < end:
+                stop = min(start + chunk_size, end)
+                if stop < end:
+                    cut = mapped.rfind(b"\n", start, stop)
+                    if cut < 0:
+                        # a line longer than a chunk
+                        cut = mapped.find(b"\n", stop, end)
+                    stop = end if cut < 0 else cut + 1
+                if mapped[stop - 1] == _NL:
+                    self._parse_lines(
+                        np.frombuffer(mapped, np.uint8, stop - start, start)
+                    )
+                else:
+                    # the last line has no line break, `finish` parses it
+                    self.feed(mapped[start:stop])
+                start = stop
+        self.finish()
+
+    def feed(self, chunk: bytes) -> None:
+        """Parse all complete lines of `chunk`, keeping the trailing partial line."""
+        data = self._pending + chunk if self._pending else chunk
+        cut = data.rfind(b"\n")
+        if cut < 0:
+            self._pending = data
+            return
+        self._pending = data[cut + 1 :]
+        self._parse_lines(data[: cut + 1])
+
+    def finish(self) -> None:
+        if self._pending:
+            pending, self._pending = self._pending, b""
+            self._parse_lines(pending + b"\n")
+
+        self._collect_faces()
+        if self.on_object_faces is not None:
+            self._emit_objects(keep_current=False)
+
+    def _collect_faces(self) -> None:
+        """Merge the per chunk face arrays into the public face arrays."""
+        self.face_indices = _concat(self._face_indices, (0,), np.int32)
+        face_sizes = _concat(self._face_sizes, (0,), np.int64)
+        self.face_offsets = np.zeros(len(face_sizes) + 1, dtype=np.int64)
+        np.cumsum(face_sizes, out=self.face_offsets[1:])
+        self.face_objects = _concat(self._face_objects, (0,), np.int32)
+        self.face_materials = _concat(self._face_materials, (0,), np.int32)
+
+        self._face_indices = []
+        self._face_sizes = []
+        self._face_objects = []
+        self._face_materials = []
+
+    def _emit_objects(self, keep_current: bool) -> None:
+        """Hand the collected faces over to `on_object_faces`, one object at a time.
+        With `keep_current`, the faces of the still open object are kept back."""
+        emitted = np.ones(len(self.face_objects), dtype=np.bool_)
+        if keep_current:
+            emitted = self.face_objects != self._crt_object
+
+        emitted_objects = self.face_objects[emitted]
+        object_ids, first_faces = np.unique(emitted_objects, return_index=True)
+        for object_id in object_ids[np.argsort(first_faces)]:
+            faces = np.flatnonzero(self.face_objects == object_id)
+            indices, offsets = gather_faces(self.face_indices, self.face_offsets, faces)
+            self.on_object_faces(
+                self.object_names[object_id],
+                indices,
+                offsets,
+                self.face_materials[faces],
+            )
+
+        kept = np.flatnonzero(~emitted)
+        indices, offsets = gather_faces(self.face_indices, self.face_offsets, kept)
+        if len(kept):
+            self._face_indices = [indices]
+            self._face_sizes = [np.diff(offsets)]
+            self._face_objects = [self.face_objects[kept]]
+            self._face_materials = [self.face_materials[kept]]
+
+    def object_id(self, name: str) -> int:
+        if name not in self._object_ids:
+            self._object_ids[name] = len(self.object_names)
+            self.object_names.append(name)
+        return self._object_ids[name]
+
+    def material_id(self, name: str) -> int:
+        if name not in self._material_ids:
+            self._material_ids[name] = len(self.material_names)
+            self.material_names.append(name)
+        return self._material_ids[name]
+
+    def _parse_lines(self, data) -> None:
+        """Parse a buffer made of complete, newline terminated lines."""
+        buf = np.frombuffer(data, dtype=np.uint8)
+        ends = np.flatnonzero(buf == _NL)
+        line_starts = np.empty_like(ends)
+        line_starts[0] = 0
+        line_starts[1:] = ends[:-1] + 1
+        line_lengths = ends - line_starts + 1
+
+        # Position of the first non blank character of every line (the legacy parser
+        # strips lines). Indented lines are rare, so those are fixed up one by one.
+        starts = line_starts.copy()
+        indented = np.flatnonzero((buf[starts] == _SPACE) | (buf[starts] == _TAB))
+        for line in indented:
+            start = starts[line]
+            while buf[start] == _SPACE or buf[start] == _TAB:
+                start += 1
+            starts[line] = start
+
+        c0 = buf[starts]
+        c1 = buf[np.minimum(starts + 1, len(buf) - 1)]
+        c2 = buf[np.minimum(starts + 2, len(buf) - 1)]
+        c1_blank = (c1 == _SPACE) | (c1 == _TAB)
+        c2_blank = (c2 == _SPACE) | (c2 == _TAB)
+
+        kind = np.full(len(starts), _OTHER, dtype=np.int8)
+        kind[(c0 == _NL) | (c0 == _CR) | (c0 == _HASH)] = _SKIP
+        kind[(c0 == ord("l")) & c1_blank] = _SKIP
+        kind[(c0 == ord("v")) & c1_blank] = _VERTEX
+        kind[(c0 == ord("f")) & c1_blank] = _FACE
+        kind[
+            (c0 == ord("v"))
+            & ((c1 == ord("t")) | (c1 == ord("n")) | (c1 == ord("p")))
+            & c2_blank
+        ] = _VERTEX_DATA
+
+        is_vertex = kind == _VERTEX
+        is_face = kind == _FACE
+
+        # Tokens are whitespace separated: blank out the directive letters and
+        # normalize \r and \t so numpy can parse the selected bytes directly
+        work = buf.copy()
+        work[starts[is_vertex | is_face]] = _SPACE
+        work[(work == _CR) | (work == _TAB)] = _SPACE
+
+        # Vertices must be counted before faces, relative indices depend on them
+        vertex_lines_before = np.cumsum(is_vertex)
+        self._parse_vertices(work, is_vertex, line_lengths)
+
+        face_lines = np.flatnonzero(is_face)
+        object_changed = self._handle_directives(buf, kind, starts, ends)
+        if len(face_lines):
+            vertex_count_at_face = (
+                self.vertex_count
+                - int(is_vertex.sum())
+                + vertex_lines_before[face_lines]
+            )
+            indices, sizes = self._parse_faces(
+                work, is_face, line_lengths, vertex_count_at_face
+            )
+            self.add_faces(indices, sizes, *self._face_state(face_lines))
+        self._apply_state_changes()
+
+        if object_changed and self.on_object_faces is not None:
+            self._collect_faces()
+            self._emit_objects(keep_current=True)
+
+    def add_vertices(
+        self, vertices: np.ndarray, colors: np.ndarray, has_color: np.ndarray
+    ) -> None:
+        self._vertices.extend(vertices)
+        self._vertex_colors.extend(colors)
+        self._has_color.extend(has_color)
+        self.vertex_count += len(vertices)
+
+    def add_faces(
+        self,
+        indices: np.ndarray,
+        sizes: np.ndarray,
+        objects: np.ndarray,
+        materials: np.ndarray,
+    ) -> None:
+        self._face_indices.append(indices.astype(np.int32))
+        self._face_sizes.append(sizes)
+        self._face_objects.append(objects)
+        self._face_materials.append(materials)
+        self.face_count += len(sizes)
+
+    def _parse_vertices(
+        self, work: np.ndarray, is_vertex: np.ndarray, line_lengths: np.ndarray
+    ) -> None:
+        vertex_lengths = line_lengths[is_vertex]
+        if not len(vertex_lengths):
+            return
+        selected = work[np.repeat(is_vertex, line_lengths)]
+        counts = _count_tokens(selected, vertex_lengths)
+        values = _parse_numbers(selected, np.float64, int(counts.sum()))
+
+        row_starts = np.zeros(len(counts), dtype=np.int64)
+        np.cumsum(counts[:-1], out=row_starts[1:])
+        if not np.isin(counts, (3, 4, 6)).all():
+            bad = counts[~np.isin(counts, (3, 4, 6))][0]
+            raise ValueError(f"Unsupported OBJ vertex definition with {bad} values")
+
+        vertices = np.empty((len(counts), 3), dtype=np.float64)
+        vertices[:, 0] = values[row_starts]
+        vertices[:, 1] = values[row_starts + 2]
+        vertices[:, 2] = values[row_starts + 1]
+
+        has_color = counts == 6
+        colors = np.zeros((len(counts), 3), dtype=np.float64)
+        if has_color.any():
+            color_starts = row_starts[has_color] + 3
+            for channel in range(3):
+                colors[has_color, channel] = values[color_starts + channel]
+
+        self.add_vertices(vertices, colors, has_color)
+
+    def _parse_faces(
+        self,
+        work: np.ndarray,
+        is_face: np.ndarray,
+        line_lengths: np.ndarray,
+        vertex_count_at_face: np.ndarray,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        face_lengths = line_lengths[is_face]
+        selected = work[np.repeat(is_face, line_lengths)]
+
+        # Keep only the vertex index of `v/vt/vn` references: every byte following
+        # a slash within the same token is blanked out
+        is_ws = (selected == _SPACE) | (selected == _NL)
+        token_ids = np.cumsum(is_ws, dtype=np.int32)
+        slash_tokens = np.where(selected == _SLASH, token_ids, -1)
+        np.maximum.accumulate(slash_tokens, out=slash_tokens)
+        selected[slash_tokens == token_ids] = _SPACE
+
+        sizes = _count_tokens(selected, face_lengths)
+        values = _parse_numbers(selected, np.int64, int(sizes.sum()))
+        return self._resolve_indices(values, sizes, vertex_count_at_face), sizes
+
+    def _resolve_indices(
+        self, values: np.ndarray, sizes: np.ndarray, vertex_count_at_face: np.ndarray
+    ) -> np.ndarray:
+        # Positive indices are 1-based, negative ones are relative to the vertices
+        # declared so far
+        relative_base = np.repeat(vertex_count_at_face, sizes)
+        return np.where(
+            values > 0, values - 1, np.where(values < 0, relative_base + values, values)
+        )
+
+    def _handle_directives(
+        self, buf: np.ndarray, kind: np.ndarray, starts: np.ndarray, ends: np.ndarray
+    ) -> bool:
+        """Dispatch the remaining directives, returns whether the object changed."""
+        # Unsupported vertex data is only reported, once per directive and chunk
+        vertex_data_lines = np.flatnonzero(kind == _VERTEX_DATA)
+        reported = set()
+        for line in vertex_data_lines:
+            directive = buf[starts[line] : starts[line] + 2].tobytes()
+            if directive not in reported:
+                reported.add(directive)
+                self.on_directive([directive.decode()])
+
+        self._change_lines = change_lines = []
+        self._change_objects = change_objects = []
+        self._change_materials = change_materials = []
+        for line in np.flatnonzero(kind == _OTHER):
+            line_bytes = buf[starts[line] : ends[line]].tobytes()
+            text = line_bytes.decode("utf-8", errors="replace")
+            parts = text.strip().split(" ")
+            object_name, material_name = self.on_directive(parts)
+            change_lines.append(line)
+            change_objects.append(self.object_id(object_name))
+            change_materials.append(self.material_id(material_name))
+
+        return any(obj != self._crt_object for obj in change_objects)
+
+    def _face_state(self, face_lines: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Object and material of every face, the state set by the last directive
+        preceding it."""
+        face_objects = np.full(len(face_lines), self._crt_object, dtype=np.int32)
+        face_materials = np.full(len(face_lines), self._crt_material, dtype=np.int32)
+        if self._change_lines:
+            last_change = np.searchsorted(self._change_lines, face_lines) - 1
+            changed = last_change >= 0
+            face_objects[changed] = np.asarray(self._change_objects)[
+                last_change[changed]
+            ]
+            face_materials[changed] = np.asarray(self._change_materials)[
+                last_change[changed]
+            ]
+        return face_objects, face_materials
+
+    def _apply_state_changes(self) -> None:
+        if self._change_lines:
+            self._crt_object = self._change_objects[-1]
+            self._crt_material = self._change_materials[-1]
+
+
+def map_file(file_path: str) -> Optional[mmap.mmap]:
+    """
+    Read-only memory map of a file, None if it is empty. Pages are read on demand
+    and shared through the page cache, e.g. with a retry of the same import.
+    """
+    with open(file_path, "rb") as f:
+        if not os.fstat(f.fileno()).st_size:
+            return None
+        # Not closed explicitly: arrays of a failed parse may still reference it,
+        # it is unmapped once released
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _count_tokens(selected: np.ndarray, line_lengths: np.ndarray) -> np.ndarray:
+    """Count the whitespace separated tokens on each of the selected lines."""
+    is_token = (selected != _SPACE) & (selected != _NL)
+    token_starts = is_token.copy()
+    token_starts[1:] &= ~is_token[:-1]
+    line_offsets = np.zeros(len(line_lengths), dtype=np.int64)
+    np.cumsum(line_lengths[:-1], out=line_offsets[1:])
+    return np.add.reduceat(token_starts.astype(np.int64), line_offsets)
+
+
+def _parse_numbers(selected: np.ndarray, dtype, expected: int) -> np.ndarray:
+    error = "Could not parse numeric values in OBJ vertex or face data"
+    try:
+        values = np.array(selected.tobytes().split(), dtype=dtype)
+    except ValueError:
+        raise ValueError(error) from None
+    if len(values) != expected:
+        raise ValueError(error)
+    return values
+
+
+def split_faces(face_indices: np.ndarray, face_offsets: np.ndarray, face_groups):
+    """
+    Split faces into groups (e.g. object/material pairs), renumbering the vertices
+    of every group in order of first use. This is done for all groups at once by
+    keying every index with its group, and taking unique/inverse of those keys.
+
+    Yields (group, global vertex ids, local face indices, face offsets) per group,
+    in order of first appearance.
+    """
+    groups, first_faces, face_group_ids = np.unique(
+        face_groups, return_index=True, return_inverse=True
+    )
+    group_order = np.argsort(first_faces)
+    group_rank = np.empty_like(group_order)
+    group_rank[group_order] = np.arange(len(groups))
+    face_ranks = group_rank[face_group_ids.reshape(-1)]
+
+    # Faces of the same group become contiguous, in their original order
+    faces = np.argsort(face_ranks, kind="stable")
+    indices, offsets = gather_faces(face_indices, face_offsets, faces)
+    face_starts = np.zeros(len(groups) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(face_ranks, minlength=len(groups)), out=face_starts[1:])
+
+    if len(indices) and (indices.min() < 0 or indices.max() >= _MAX_VERTEX_ID):
+        raise ValueError("OBJ face references an undefined vertex")
+    index_ranks = np.repeat(face_ranks[faces], np.diff(offsets))
+    keys = index_ranks * _MAX_VERTEX_ID + indices
+
+    unique_keys, first_use, inverse = np.unique(
+        keys, return_index=True, return_inverse=True
+    )
+    # Order unique keys by first use: this keeps them grouped (groups are contiguous)
+    # and numbers the vertices of each group in order of first use
+    order = np.argsort(first_use)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    vertex_ids = unique_keys[order] % _MAX_VERTEX_ID
+    vertex_starts = np.zeros(len(groups) + 1, dtype=np.int64)
+    np.cumsum(
+        np.bincount(unique_keys // _MAX_VERTEX_ID, minlength=len(groups)),
+        out=vertex_starts[1:],
+    )
+    local_indices = (rank[inverse.reshape(-1)] - vertex_starts[index_ranks]).astype(
+        np.int32
+    )
+
+    for rank_id in range(len(groups)):
+        first_face, end_face = face_starts[rank_id], face_starts[rank_id + 1]
+        first_index, end_index = offsets[first_face], offsets[end_face]
+        yield (
+            groups[group_order[rank_id]],
+            vertex_ids[vertex_starts[rank_id] : vertex_starts[rank_id + 1]],
+            local_indices[first_index:end_index],
+            offsets[first_face : end_face + 1] - first_index,
+        )
+
+
+class _GrowableArray(object):
+    """Append-only array with amortized growth, so vertices stay contiguous."""
+
+    def __init__(self, item_shape, dtype) -> None:
+        self._buffer = np.empty((1024,) + tuple(item_shape), dtype=dtype)
+        self._size = 0
+
+    @property
+    def data(self) -> np.ndarray:
+        return self._buffer[: self._size]
+
+    def extend(self, values: np.ndarray) -> None:
+        needed = self._size + len(values)
+        if needed > len(self._buffer):
+            grown = np.empty(
+                (max(needed, 2 * len(self._buffer)),) + self._buffer.shape[1:],
+                dtype=self._buffer.dtype,
+            )
+            grown[: self._size] = self._buffer[: self._size]
+            self._buffer = grown
+        self._buffer[self._size : needed] = values
+        self._size = needed
+
+
+def _concat(parts: List[np.ndarray], empty_shape, dtype) -> np.ndarray:
+    if not parts:
+        return np.zeros(empty_shape, dtype=dtype)
+    if len(parts) == 1:
+        return parts[0].astype(dtype, copy=False)
+    return np.concatenate(parts).astype(dtype, copy=False)
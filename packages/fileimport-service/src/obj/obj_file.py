@@ -1,14 +1,36 @@
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Callable, Dict, List, Any, Optional, Tuple
 from mtl_file_collection import MtlFileCollection
+from obj_array_parser import ObjArrayParser, split_faces
+from obj_parallel_parser import parse_parallel
 import os
 
+import numpy as np
+
 import structlog
 
 LOG = structlog.get_logger()
 
 
 class ObjFile(object):
-    def __init__(self, file_path) -> None:
+    def __init__(
+        self,
+        file_path,
+        vectorized: bool = False,
+        on_object: Optional[Callable[[str, List[Dict[str, Any]]], None]] = None,
+        processes: int = 1,
+        defer_post_process: bool = False,
+    ) -> None:
+        """
+        With `on_object(name, meshes)`, the file is parsed in vectorized mode and every
+        object is passed on as soon as it is complete instead of being collected in
+        `self.objects`, so memory is bounded by the largest object (plus vertices).
+
+        With `processes` above 1, byte ranges of the file are parsed in vectorized mode
+        by a pool of that many processes, see `parse_parallel`.
+
+        With `defer_post_process`, `self.objects` is only built once `post_process()`
+        is called, e.g. to time it separately.
+        """
         self.logged_unsupported = set()
         self.mtl_files = MtlFileCollection(os.path.dirname(file_path))
 
@@ -22,6 +44,32 @@ class ObjFile(object):
         # Constructed in the post-process phase
         self.objects: Dict[str, List[Dict[str, Any]]] = {}
 
+        # Only set in vectorized and parallel mode, see `parse_vectorized`
+        self.arrays: Optional[ObjArrayParser] = None
+        self.on_object = on_object
+
+        if processes > 1 and on_object is None:
+            self.arrays = parse_parallel(file_path, processes, self.on_directive)
+        elif vectorized or on_object is not None:
+            self.parse_vectorized(file_path)
+        else:
+            self.parse_lines(file_path)
+        if on_object is None and not defer_post_process:
+            self.post_process()
+
+    @property
+    def vertex_count(self) -> int:
+        if self.arrays is not None:
+            return self.arrays.vertex_count
+        return len(self.vertices)
+
+    @property
+    def face_count(self) -> int:
+        if self.arrays is not None:
+            return self.arrays.face_count
+        return len(self.faces)
+
+    def parse_lines(self, file_path):
         with open(file_path, "r") as f:
             while True:
                 line = f.readline()
@@ -36,20 +84,80 @@ class ObjFile(object):
                     self.on_l(parts[1:])
                 elif parts[0] == "f":
                     self.on_f(parts[1:])
-                elif parts[0] == "mtllib":
-                    self.mtl_files.mtllib(" ".join(parts[1:]))
-                elif parts[0] == "usemtl":
-                    self.crt_mtl = " ".join(parts[1:])
-                elif parts[0] == "o":
-                    self.crt_object = parts[1]
                 else:
-                    if parts[0] not in self.logged_unsupported:
-                        LOG.warn("Unsupported OBJ directive: " + parts[0])
-                        self.logged_unsupported.add(parts[0])
-        self.post_process()
+                    self.on_directive(parts)
+
+    def parse_vectorized(self, file_path):
+        # Vertices and faces end up in contiguous arrays instead of per-line
+        # tuples and dicts, the remaining directives go through `on_directive`
+        self.arrays = ObjArrayParser(
+            self.on_directive,
+            on_object_faces=self.on_object_faces if self.on_object else None,
+        )
+        self.arrays.parse_file(file_path)
 
-    def flatten_vertices(self):
-        return [coord for point in self.vertices for coord in point]
+    def on_object_faces(self, object_name, face_indices, face_offsets, face_materials):
+        self.on_object(
+            object_name, self.build_meshes(face_indices, face_offsets, face_materials)
+        )
+
+    def build_meshes(
+        self,
+        face_indices: np.ndarray,
+        face_offsets: np.ndarray,
+        face_materials: np.ndarray,
+    ) -> List[Dict[str, Any]]:
+        """Split the faces of one object into one mesh per material."""
+        return [
+            self.make_mesh(self.arrays.material_names[material_id], *mesh)
+            for material_id, *mesh in split_faces(
+                face_indices, face_offsets, face_materials
+            )
+        ]
+
+    def make_mesh(
+        self,
+        mtl: str,
+        vertex_ids: np.ndarray,
+        faces: np.ndarray,
+        face_offsets: np.ndarray,
+    ) -> Dict[str, Any]:
+        """
+        Mesh of one object/material pair:
+          - `vertices`: float64 (n, 3)
+          - `vertex_colors`: float64 (n, 3), white where a vertex has no color, or
+            None if no vertex of the mesh has a color
+          - `faces` / `face_offsets`: local vertex indices, face i is
+            faces[face_offsets[i]:face_offsets[i + 1]]
+        """
+        arrays = self.arrays
+        vertex_colors = None
+        if arrays.has_color[vertex_ids].any():
+            vertex_colors = np.where(
+                arrays.has_color[vertex_ids, np.newaxis],
+                arrays.vertex_colors[vertex_ids],
+                1.0,
+            )
+        return {
+            "material": self.mtl_files.get_material(mtl),
+            "vertices": arrays.vertices[vertex_ids],
+            "vertex_colors": vertex_colors,
+            "faces": faces,
+            "face_offsets": face_offsets,
+        }
+
+    def on_directive(self, parts) -> Tuple[str, str]:
+        if parts[0] == "mtllib":
+            self.mtl_files.mtllib(" ".join(parts[1:]))
+        elif parts[0] == "usemtl":
+            self.crt_mtl = " ".join(parts[1:])
+        elif parts[0] == "o":
+            self.crt_object = parts[1]
+        else:
+            if parts[0] not in self.logged_unsupported:
+                LOG.warn("Unsupported OBJ directive: " + parts[0])
+                self.logged_unsupported.add(parts[0])
+        return self.crt_object, self.crt_mtl
 
     def on_v(self, params):
         r, g, b = None, None, None
@@ -79,47 +187,63 @@ class ObjFile(object):
             # If an index is negative then it relatively refers to the end of the vertex list, -1 referring to the last element.
             if v_index > 0:
                 v_index -= 1
+            elif v_index < 0:
+                v_index += len(self.vertices)
             indices.append(v_index)
 
         self.faces.append(
             {"indices": indices, "object": self.crt_object, "mtl": self.crt_mtl}
         )
 
+    def lines_to_arrays(self) -> None:
+        """Move the vertices and faces collected by the line parser into arrays."""
+        arrays = ObjArrayParser(self.on_directive)
+        if self.vertices:
+            has_color = np.array([c is not None for c in self.vertex_colors])
+            colors = np.zeros((len(self.vertices), 3), dtype=np.float64)
+            if has_color.any():
+                colors[has_color] = [c for c in self.vertex_colors if c is not None]
+            arrays.add_vertices(
+                np.array(self.vertices, dtype=np.float64), colors, has_color
+            )
+
+        sizes = np.array([len(face["indices"]) for face in self.faces], dtype=np.int64)
+        indices = np.fromiter(
+            (i for face in self.faces for i in face["indices"]),
+            dtype=np.int64,
+            count=int(sizes.sum()),
+        )
+        objects = np.array(
+            [arrays.object_id(face["object"]) for face in self.faces], dtype=np.int32
+        )
+        materials = np.array(
+            [arrays.material_id(face["mtl"]) for face in self.faces], dtype=np.int32
+        )
+        arrays.add_faces(indices, sizes, objects, materials)
+        arrays.finish()
+
+        self.arrays = arrays
+        self.vertices = []
+        self.vertex_colors = []
+        self.faces = []
+
     def post_process(self):
-        # Step 1: group into object_id/material_id/[faces_with_global_indices]
-        objects: Dict[str, Any] = {}
-        for face in self.faces:
-            if face["object"] not in objects:
-                objects[face["object"]] = {}
-            obj = objects[face["object"]]
-            if face["mtl"] not in obj:
-                obj[face["mtl"]] = []
-            obj[face["mtl"]].append(face["indices"])
-
-        # Step 2: construct final structure: object_id / [{material, local_vertices, vertex_colors, faces_with_local_indices}]
-        for object in objects:
-            self.objects[object] = []
-            for mtl in objects[object].keys():
-                material = self.mtl_files.get_material(mtl)
-                vertices = []
-                vertex_colors = []
-                faces = []
-
-                v_global2local_id = {}
-                for face in objects[object][mtl]:
-                    for global_v in face:
-                        if global_v not in v_global2local_id:
-                            v_global2local_id[global_v] = len(vertices)
-                            vertices.append(self.vertices[global_v])
-                            vertex_colors.append(self.vertex_colors[global_v])
-
-                    faces.append([v_global2local_id[global_id] for global_id in face])
-
-                self.objects[object].append(
-                    {
-                        "material": material,
-                        "vertices": vertices,
-                        "vertex_colors": vertex_colors,
-                        "faces": faces,
-                    }
-                )
+        if self.arrays is None:
+            self.lines_to_arrays()
+        arrays = self.arrays
+
+        # Group faces by object/material pair, every pair becoming one mesh with its
+        # own vertices. Objects and materials keep their order of first appearance.
+        material_count = max(len(arrays.material_names), 1)
+        face_groups = (
+            arrays.face_objects.astype(np.int64) * material_count
+            + arrays.face_materials
+        )
+        for group, *mesh in split_faces(
+            arrays.face_indices, arrays.face_offsets, face_groups
+        ):
+            obj, mtl = divmod(int(group), material_count)
+            object_name = arrays.object_names[obj]
+            self.objects.setdefault(object_name, []).append(
+                self.make_mesh(arrays.material_names[mtl], *mesh)
+            )
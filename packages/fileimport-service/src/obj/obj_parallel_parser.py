@@ -0,0 +1,170 @@
+import os
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+from obj_array_parser import DEFAULT_CHUNK_SIZE, ObjArrayParser
+
+# Ranges are not made smaller than this, below it the process start up and the
+# transfer of the results outweigh the parallel parsing
+MIN_RANGE_SIZE = 16 * 1024 * 1024
+
+# Object / material state at the start of a range, only known once the ranges
+# before it are parsed. OBJ names cannot contain a NUL byte.
+_INHERITED = "\0"
+
+
+def split_ranges(
+    file_path: str, count: int, min_size: int = MIN_RANGE_SIZE
+) -> List[Tuple[int, int]]:
+    """
+    Split a file into up to `count` byte ranges of similar size, every range
+    starting at the beginning of a line.
+    """
+    size = os.path.getsize(file_path)
+    count = max(1, min(count, size // max(min_size, 1)))
+    boundaries = [0]
+    with open(file_path, "rb") as f:
+        for i in range(1, count):
+            # the line containing the byte before the target ends the range, so
+            # a target at the start of a line stays there
+            f.seek(max(i * size // count - 1, boundaries[-1]))
+            f.readline()
+            boundary = f.tell()
+            if boundary >= size:
+                break
+            if boundary > boundaries[-1]:
+                boundaries.append(boundary)
+    boundaries.append(size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+class _RangeParser(ObjArrayParser):
+    """
+    Parses one byte range without the state of the ranges before it: the
+    initial object and material are `_INHERITED`, relative indices are resolved
+    against the vertices of the range only and flagged in the result, other
+    directives are recorded in `directives` to be replayed in file order.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(self._on_directive, initial_state=(_INHERITED, _INHERITED))
+        self.directives: List[List[str]] = []
+        self.object_name = _INHERITED
+        self.material_name = _INHERITED
+        self._face_relative: List[np.ndarray] = []
+
+    def _on_directive(self, parts: List[str]) -> Tuple[str, str]:
+        # Same state handling as `ObjFile.on_directive`
+        if parts[0] == "usemtl":
+            self.material_name = " ".join(parts[1:])
+        elif parts[0] == "o":
+            self.object_name = parts[1]
+        self.directives.append(parts)
+        return self.object_name, self.material_name
+
+    def _resolve_indices(
+        self, values: np.ndarray, sizes: np.ndarray, vertex_count_at_face: np.ndarray
+    ) -> np.ndarray:
+        self._face_relative.append(values < 0)
+        return super()._resolve_indices(values, sizes, vertex_count_at_face)
+
+    def result(self) -> Dict[str, Any]:
+        return {
+            "vertices": self.vertices,
+            "vertex_colors": self.vertex_colors,
+            "has_color": self.has_color,
+            "face_indices": self.face_indices,
+            "face_sizes": np.diff(self.face_offsets),
+            "face_relative": np.concatenate(self._face_relative)
+            if self._face_relative
+            else np.zeros(0, dtype=np.bool_),
+            "face_objects": self.face_objects,
+            "face_materials": self.face_materials,
+            "object_names": self.object_names,
+            "material_names": self.material_names,
+            "directives": self.directives,
+            "final_state": (self.object_name, self.material_name),
+        }
+
+
+def parse_range(
+    file_path: str, start: int, end: int, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Dict[str, Any]:
+    """Parse the lines of `file_path` in [start, end), see `_RangeParser`."""
+    parser = _RangeParser()
+    parser.parse_file(file_path, chunk_size, start, end)
+    return parser.result()
+
+
+def parse_parallel(
+    file_path: str,
+    processes: int,
+    on_directive: Callable[[List[str]], Tuple[str, str]],
+) -> ObjArrayParser:
+    """
+    Parse an OBJ file split into byte ranges, in a pool of `processes`. Returns a
+    finished `ObjArrayParser` holding the same arrays as parsing the whole file
+    with one, `on_directive` receives the directives in file order.
+    """
+    ranges = split_ranges(file_path, processes, MIN_RANGE_SIZE)
+    if len(ranges) == 1:
+        return merge_ranges([parse_range(file_path, *ranges[0])], on_directive)
+    # only imported when used, the process pool is slow to import
+    from concurrent.futures import ProcessPoolExecutor
+
+    starts, ends = zip(*ranges)
+    with ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+        # ranges are merged in file order while the following ones are parsed
+        results = pool.map(parse_range, [file_path] * len(ranges), starts, ends)
+        return merge_ranges(results, on_directive)
+
+
+def merge_ranges(
+    results, on_directive: Callable[[List[str]], Tuple[str, str]]
+) -> ObjArrayParser:
+    """
+    Concatenate the parsed ranges in file order. Ranges start with the state the
+    previous one ended with, and their relative indices are offset by the
+    vertices declared before them, the prefix sum of the vertex counts.
+    """
+    merged = ObjArrayParser(on_directive)
+    object_name, material_name = "", ""
+    for result in results:
+        for parts in result["directives"]:
+            on_directive(parts)
+
+        object_ids = np.array(
+            [
+                merged.object_id(object_name if name == _INHERITED else name)
+                for name in result["object_names"]
+            ],
+            dtype=np.int32,
+        )
+        material_ids = np.array(
+            [
+                merged.material_id(material_name if name == _INHERITED else name)
+                for name in result["material_names"]
+            ],
+            dtype=np.int32,
+        )
+
+        face_indices = result["face_indices"]
+        face_indices[result["face_relative"]] += merged.vertex_count
+        merged.add_vertices(
+            result["vertices"], result["vertex_colors"], result["has_color"]
+        )
+        merged.add_faces(
+            face_indices,
+            result["face_sizes"],
+            object_ids[result["face_objects"]],
+            material_ids[result["face_materials"]],
+        )
+
+        final_object, final_material = result["final_state"]
+        if final_object != _INHERITED:
+            object_name = final_object
+        if final_material != _INHERITED:
+            material_name = final_material
+    merged.finish()
+    return merged
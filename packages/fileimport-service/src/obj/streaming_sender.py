@@ -0,0 +1,80 @@
+from typing import Dict, List, Tuple
+
+from specklepy.objects.base import Base
+from specklepy.serialization.base_object_serializer import BaseObjectSerializer
+from specklepy.transports.abstract_transport import AbstractTransport
+
+
+class SentObject(Base, speckle_type="Speckle.Core.Models.SentObject"):
+    """
+    Stand-in for an object already written to the transports by `StreamingSender`.
+    Placing it in a detachable property (e.g. `Collection.elements`) serializes it as
+    a reference, with its children merged into the parent's closure table.
+    """
+
+    def __init__(self, sent_id: str, closure: Dict[str, int]) -> None:
+        super().__init__()
+        self._sent_id = sent_id
+        self._closure = closure
+
+    @property
+    def sent_id(self) -> str:
+        return self._sent_id
+
+    @property
+    def closure(self) -> Dict[str, int]:
+        return self._closure
+
+
+# Overrides internals of specklepy's serializer, which is why specklepy is pinned to
+# an exact version. `benchmarks/obj_streaming.py` checks that it still writes the same
+# objects as `operations.send`.
+class _StreamingSerializer(BaseObjectSerializer):
+    def _traverse_base(self, base: Base) -> Tuple[str, Dict]:
+        if not isinstance(base, SentObject):
+            return super()._traverse_base(base)
+
+        # The caller pushed a lineage entry for this object and creates the reference
+        # to it, only its already serialized children need to be accounted for
+        self.detach_lineage.pop()
+        depth = len(self.detach_lineage)
+        for parent in self.lineage:
+            family = self.family_tree.setdefault(parent, {})
+            for ref_id, child_depth in base.closure.items():
+                if ref_id not in family or family[ref_id] > depth + child_depth:
+                    family[ref_id] = depth + child_depth
+        return base.sent_id, {}
+
+
+class StreamingSender(object):
+    """
+    Serializes and writes objects to the transports one at a time, so they can be
+    uploaded while the rest of the file is still being parsed.
+
+    Usage: `send()` every child object, reference the returned `SentObject`s from the
+    root object and `finish()` with the root to get the id to create a version with.
+    """
+
+    def __init__(self, transports: List[AbstractTransport]) -> None:
+        self.transports = transports
+        self.serializer = _StreamingSerializer(write_transports=transports)
+        for transport in self.transports:
+            transport.begin_write()
+
+    def send(self, base: Base) -> SentObject:
+        obj_id, obj = self._write(base)
+        return SentObject(obj_id, obj.get("__closure", {}))
+
+    def finish(self, root: Base) -> str:
+        obj_id, _ = self._write(root)
+        for transport in self.transports:
+            transport.end_write()
+        return obj_id
+
+    def _write(self, base: Base) -> Tuple[str, Dict]:
+        serializer = self.serializer
+        serializer.detach_lineage = [True]
+        serializer.lineage = []
+        serializer.family_tree = {}
+        serializer.closure_table = {}
+        return serializer._traverse_base(base)
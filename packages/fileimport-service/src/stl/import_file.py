@@ -1,86 +1,195 @@
 import json
-from typing import Optional
-import stl
+from typing import TYPE_CHECKING, Callable, Optional
+import numpy as np
+from specklepy.objects.base import Base
+from specklepy.objects.data_objects import DataObject
 from specklepy.objects.geometry import Mesh
-from specklepy.transports.server import ServerTransport
-from specklepy.api.client import SpeckleClient
-from specklepy.api import operations
-from specklepy.core.api.inputs import CreateModelInput, CreateVersionInput
+from specklepy.transports.abstract_transport import AbstractTransport
 from specklepy.objects.models.units import Units
-from specklepy.core.api.models import Version
 
 import sys
 import os
+from stl_reader import read_triangles
+
+sys.path.insert(
+    1, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common")
+)
+from mesh_chunks import (  # noqa: E402
+    MESH_CHUNK_MAX_FACES,
+    MESH_CHUNK_MAX_VERTICES,
+    chunk_mesh,
+)
+from conversion_memo import conversion_key, memoized_send  # noqa: E402
+from import_stats import stage_timer  # noqa: E402
+from server_connection import ServerConnection  # noqa: E402
+
+if TYPE_CHECKING:
+    from specklepy.core.api.models import Version
 
 DEFAULT_BRANCH = "uploads"
+# Part of the key of memoized conversions, bump it when the converted objects change
+CONVERSION_VERSION = 2
+# Welds coincident vertices when set, e.g. "0" for exact matches or "1e-6"
+STL_WELD_TOLERANCE = (
+    float(os.environ["STL_WELD_TOLERANCE"]) if os.getenv("STL_WELD_TOLERANCE") else None
+)
+
+
+def weld_vertices(vertices: np.ndarray, tolerance: float):
+    """
+    Collapses vertices that fall into the same cell of a grid with `tolerance`
+    spacing (exact float matches for a tolerance of 0). Returns the unique
+    vertices, in order of first appearance, and the index of each input vertex.
+    """
+    if tolerance > 0:
+        keys = np.floor(vertices / tolerance + 0.5).astype(np.int64)
+    else:
+        # -0.0 and 0.0 are the same point
+        keys = (vertices + 0).view(f"i{vertices.dtype.itemsize}")
+    # lexsort is stable: the first vertex of every group of equal keys is the one
+    # appearing first in the file
+    order = np.lexsort(keys.T[::-1])
+    sorted_keys = keys[order]
+    starts = np.empty(len(order), dtype=bool)
+    starts[:1] = True
+    np.any(sorted_keys[1:] != sorted_keys[:-1], axis=1, out=starts[1:])
+    first = order[starts]
+
+    # Number the groups by first appearance in the file
+    group_order = np.argsort(first)
+    group_ids = np.empty_like(group_order)
+    group_ids[group_order] = np.arange(len(group_order))
+    indices = np.empty_like(order)
+    indices[order] = group_ids[np.cumsum(starts) - 1]
+    return vertices[first[group_order]], indices
+
+
+def convert_mesh(
+    stl_triangles: np.ndarray,
+    weld_tolerance: Optional[float] = None,
+    name: str = "",
+) -> Base:
+    """
+    Every STL facet is a triangle with its own three vertices, `stl_triangles`
+    holds them as an (n, 3, 3) array. With a
+    `weld_tolerance`, coincident vertices are shared between triangles and the
+    triangles collapsed by welding are dropped.
+
+    Meshes over the chunk budget are returned as a DataObject with several
+    display values, smaller ones as a single Mesh.
+    """
+    vertices = stl_triangles.reshape(-1, 3)
+    triangles = np.arange(len(vertices), dtype=np.int64).reshape(-1, 3)
+    if weld_tolerance is not None:
+        vertices, indices = weld_vertices(vertices, weld_tolerance)
+        triangles = indices.reshape(-1, 3)
+        degenerate = (
+            (triangles[:, 0] == triangles[:, 1])
+            | (triangles[:, 1] == triangles[:, 2])
+            | (triangles[:, 0] == triangles[:, 2])
+        )
+        triangles = triangles[~degenerate]
+        print(
+            f"Welded {len(stl_triangles) * 3} vertices into {len(vertices)}, "
+            f"dropped {np.count_nonzero(degenerate)} degenerate faces"
+        )
 
+    chunks = chunk_mesh(
+        {
+            "vertices": vertices,
+            "faces": triangles.ravel(),
+            "face_offsets": np.arange(len(triangles) + 1, dtype=np.int64) * 3,
+        }
+    )
+    meshes = [
+        _to_speckle_mesh(chunk["vertices"], chunk["faces"].reshape(-1, 3))
+        for chunk in chunks
+    ]
+    if len(meshes) == 1:
+        return meshes[0]
+    print(f"Split mesh into {len(meshes)} chunks")
+    return DataObject(name=name, displayValue=meshes, properties={})
+
+
+def _to_speckle_mesh(vertices: np.ndarray, triangles: np.ndarray) -> Mesh:
+    # Mesh needs python lists to serialize, the face list is built as an array and
+    # converted in one go
+    faces = np.empty((len(triangles), 4), dtype=np.int64)
+    faces[:, 0] = 3
+    faces[:, 1:] = triangles
+    faces = faces.ravel().tolist()
+
+    return Mesh(
+        vertices=vertices.ravel().tolist(),
+        faces=faces,
+        units=Units.none,
+    )
 
-def import_stl(
-    file_path: str,
-    project_id: str,
-    model_id: Optional[str],
-    branch_name: str,
-    commit_message: str,
-) -> Version:
-    print(f"ImportSTL argv[1:]: {sys.argv[1:]}")
 
+def send_stl(file_path: str, transport: Callable[[], AbstractTransport]) -> str:
+    """
+    Parse, convert and send an STL file, returns the id of the root object.
+    `transport` is only called once the file is converted.
+    """
     # Parse input
-    stl_mesh = stl.mesh.Mesh.from_file(file_path)
+    with stage_timer.stage("parse"):
+        stl_triangles = read_triangles(file_path)
     print(
-        f"Parsed mesh with {stl_mesh.points.shape[0]} faces ({stl_mesh.points.shape[0] * 3} vertices)"
+        f"Parsed mesh with {len(stl_triangles)} faces ({len(stl_triangles) * 3} vertices)"
     )
 
     # Construct speckle obj
-    vertices = stl_mesh.points.flatten().tolist()
-    faces = []
-    for i in range(stl_mesh.points.shape[0]):
-        faces.extend([3, 3 * i, 3 * i + 1, 3 * i + 2])
-
-    speckle_mesh = Mesh(
-        vertices=vertices,
-        faces=faces,
-        units=Units.none,
-    )
+    with stage_timer.stage("convert"):
+        speckle_mesh = convert_mesh(
+            stl_triangles,
+            weld_tolerance=STL_WELD_TOLERANCE,
+            name=os.path.basename(file_path),
+        )
     print("Constructed Speckle Mesh object")
 
     # Commit
-
-    client = SpeckleClient(
-        host=os.getenv("SPECKLE_SERVER_URL", "127.0.0.1:3000"), use_ssl=False
-    )
-    token = os.environ["USER_TOKEN"]
-    if not token:
-        raise Exception('Expected an env var "USER_TOKEN"')
-    client.authenticate_with_token(token)
-
-    if model_id:
-        model = client.model.get(model_id, project_id)
-    else:
-        model = client.model.create(
-            CreateModelInput(
-                name=branch_name,
-                description="File upload branch" if branch_name == "uploads" else "",
-                project_id=project_id,
-            ),
+    target = transport()
+    from specklepy.api import operations
+
+    with stage_timer.stage("send"):
+        return operations.send(
+            base=speckle_mesh,
+            transports=[target],
+            use_default_cache=False,
         )
 
-    transport = ServerTransport(client=client, stream_id=project_id)
-    id = operations.send(
-        base=speckle_mesh,
-        transports=[transport],
-        use_default_cache=False,
-    )
 
-    create_version = CreateVersionInput(
-        project_id=project_id,
-        object_id=id,
-        model_id=model.id,
-        message=(commit_message or "STL file upload"),
-        source_application="STL",
-    )
-    version = client.version.create(create_version)
+def import_stl(
+    file_path: str,
+    project_id: str,
+    model_id: Optional[str],
+    branch_name: str,
+    commit_message: str,
+) -> "Version":
+    print(f"ImportSTL argv[1:]: {sys.argv[1:]}")
 
-    return version
+    server_url = os.getenv("SPECKLE_SERVER_URL", "127.0.0.1:3000")
+    # connects while the file is parsed and converted
+    connection = ServerConnection(server_url, project_id, model_id, branch_name)
+
+    return memoized_send(
+        lambda: conversion_key(
+            server_url,
+            project_id,
+            [file_path],
+            f"stl@{CONVERSION_VERSION}",
+            {
+                "name": os.path.basename(file_path),
+                "weld_tolerance": STL_WELD_TOLERANCE,
+                "max_vertices": MESH_CHUNK_MAX_VERTICES,
+                "max_faces": MESH_CHUNK_MAX_FACES,
+            },
+        ),
+        lambda: send_stl(file_path, connection.transport),
+        lambda object_id: connection.create_version(
+            object_id, commit_message or "STL file upload", "STL"
+        ),
+    )
 
 
 if __name__ == "__main__":
@@ -105,6 +214,7 @@ if __name__ == "__main__":
     except Exception as ex:
         results = {"success": False, "error": str(ex)}
         print(ex)
+    results.update(stage_timer.results())
 
     print(results)
     Path(tmp_results_path).write_text(json.dumps(results))
@@ -0,0 +1,125 @@
+"""
+Reads the triangles of binary and ASCII STL files straight out of a memory map,
+without the normals, attributes and derived arrays numpy-stl builds.
+"""
+
+import mmap
+import os
+import struct
+from typing import List, Optional
+
+import numpy as np
+
+# ASCII files are tokenized in chunks of this size, the temporary arrays take
+# about 20 times the size of a chunk
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+_HEADER_SIZE = 84
+# Layout of the facets of a binary STL file, the vertices are read in place
+_BINARY_FACET = np.dtype(
+    [("normal", "<f4", (3,)), ("vectors", "<f4", (3, 3)), ("attr", "<u2")]
+)
+
+_NL = ord("\n")
+_CR = ord("\r")
+_TAB = ord("\t")
+_SPACE = ord(" ")
+_VERTEX = np.frombuffer(b"vertex", dtype=np.uint8)
+
+
+def read_triangles(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> np.ndarray:
+    """
+    The vertices of the facets of an STL file as a float32 (n, 3, 3) array, the
+    same values as `stl.mesh.Mesh.from_file(file_path).vectors`. For binary files
+    this is a view of the mapped file. ASCII files with several solids get the
+    facets of all of them.
+    """
+    mapped = _map_file(file_path)
+    if mapped is None:
+        raise ValueError("Empty STL file")
+
+    # Binary files may start with "solid" too, their size is checked first
+    if len(mapped) >= _HEADER_SIZE:
+        (count,) = struct.unpack_from("<I", mapped, 80)
+        if len(mapped) == _HEADER_SIZE + count * _BINARY_FACET.itemsize:
+            facets = np.frombuffer(
+                mapped, dtype=_BINARY_FACET, count=count, offset=_HEADER_SIZE
+            )
+            return facets["vectors"]
+    if mapped[:1024].lstrip().startswith(b"solid"):
+        return _read_ascii(mapped, chunk_size)
+
+    # e.g. a binary file with a wrong facet count in its header, numpy-stl
+    # recovers some of them
+    import stl
+
+    return stl.mesh.Mesh.from_file(file_path, calculate_normals=False).vectors
+
+
+def _map_file(file_path: str) -> Optional[mmap.mmap]:
+    with open(file_path, "rb") as f:
+        if not os.fstat(f.fileno()).st_size:
+            return None
+        # Unmapped once the arrays viewing it are released
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _read_ascii(mapped: mmap.mmap, chunk_size: int) -> np.ndarray:
+    """Tokenize the `vertex x y z` lines, one chunk of complete lines at a time."""
+    parts: List[np.ndarray] = []
+    start, end = 0, len(mapped)
+    while start < end:
+        stop = min(start + chunk_size, end)
+        if stop < end:
+            cut = mapped.rfind(b"\n", start, stop)
+            if cut < 0:
+                cut = mapped.find(b"\n", stop, end)
+            stop = end if cut < 0 else cut + 1
+        chunk = np.frombuffer(mapped, np.uint8, stop - start, start)
+        parts.append(_parse_ascii_vertices(chunk))
+        start = stop
+
+    vertices = np.concatenate(parts) if parts else np.zeros((0, 3), np.float32)
+    if len(vertices) % 3:
+        raise ValueError("ASCII STL facets must have 3 vertices")
+    return vertices.reshape(-1, 3, 3)
+
+
+def _parse_ascii_vertices(chunk: np.ndarray) -> np.ndarray:
+    """The vertices of the `vertex` lines of a buffer of lines."""
+    work = chunk.copy()
+    work[(work == _CR) | (work == _TAB)] = _SPACE
+    # The last line may not end with a line break
+    if len(work) and work[-1] != _NL:
+        work = np.append(work, np.uint8(_NL))
+
+    # `vertex` keywords, which are the first token of their line
+    candidates = np.ones(max(len(work) - len(_VERTEX) + 1, 0), dtype=np.bool_)
+    for i, char in enumerate(_VERTEX):
+        candidates &= work[i : len(work) - len(_VERTEX) + 1 + i] == char
+    keywords = np.flatnonzero(candidates)
+    is_blank = (work == _SPACE) | (work == _NL)
+    keywords = keywords[is_blank[keywords + len(_VERTEX)]]
+    ends = np.flatnonzero(work == _NL)
+    line_starts = np.concatenate(([0], ends[:-1] + 1))
+    lines = np.searchsorted(ends, keywords)
+    non_blank_before = np.concatenate(([0], np.cumsum(~is_blank)))
+    keywords = keywords[
+        non_blank_before[keywords] == non_blank_before[line_starts[lines]]
+    ]
+    lines = np.searchsorted(ends, keywords)
+
+    # Keep the numbers of the vertex lines, blanking out the keywords
+    work[keywords[:, np.newaxis] + np.arange(len(_VERTEX))] = _SPACE
+    line_lengths = ends - line_starts + 1
+    is_vertex_line = np.zeros(len(ends), dtype=np.bool_)
+    is_vertex_line[lines] = True
+    selected = work[np.repeat(is_vertex_line, line_lengths)]
+    error = "Could not parse the vertices of the ASCII STL file"
+    try:
+        values = np.array(selected.tobytes().split(), dtype=np.float64)
+    except ValueError:
+        raise ValueError(error) from None
+    if len(values) != 3 * len(keywords):
+        raise ValueError(error)
+    return values.astype(np.float32).reshape(-1, 3)
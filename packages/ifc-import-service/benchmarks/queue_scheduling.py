@@ -0,0 +1,140 @@
+"""
+Simulates the completion latency of queued IFC jobs under each scheduling policy.
+
+Usage:
+    uv run benchmarks/queue_scheduling.py --jobs 2000 --slots 1 --load 0.8
+
+Jobs of mixed sizes (mostly small files, a few very large ones) arrive at random
+over time, at `--load` times the rate the slots can parse them. Whenever a slot is
+free it claims the queued job the claim query would order first, with the parse
+rate learned by the `JobScheduler` from the jobs it finished so far. The latency of
+a job is the time from it being queued to its parse finishing; the largest jobs
+are reported separately, to show that aging bounds how long they wait.
+"""
+
+import argparse
+import heapq
+import random
+import statistics
+
+from ifc_importer.scheduling import JobScheduler, SchedulingPolicy
+
+MB = 2**20
+# (share of the jobs, smallest and largest file in MB)
+FILE_SIZES = [
+    (0.80, 0.1, 5),
+    (0.15, 5, 100),
+    (0.04, 100, 500),
+    (0.01, 1000, 2000),
+]
+# A large job is one of the last size class
+LARGE_JOB_BYTES = FILE_SIZES[-1][1] * MB
+
+
+def generate_jobs(
+    count: int, load: float, slots: int, bytes_per_second: float, seed: int
+) -> list[tuple[float, int, float]]:
+    """(queued at, file size, parse seconds) of every job, by queue time."""
+    rng = random.Random(seed)
+    classes = rng.choices(
+        FILE_SIZES, weights=[share for share, _, _ in FILE_SIZES], k=count
+    )
+    sizes = [
+        int(rng.uniform(smallest, largest) * MB) for _, smallest, largest in classes
+    ]
+    # arrivals keep the slots busy `load` of the time on average
+    mean_seconds = statistics.fmean(sizes) / bytes_per_second
+    arrival_rate = load * slots / mean_seconds
+    jobs = []
+    queued_at = 0.0
+    for size in sizes:
+        queued_at += rng.expovariate(arrival_rate)
+        # the parse rate varies from file to file
+        parse_seconds = size / (bytes_per_second * rng.uniform(0.5, 1.5))
+        jobs.append((queued_at, size, parse_seconds))
+    return jobs
+
+
+def simulate(
+    jobs: list[tuple[float, int, float]], slots: int, scheduler: JobScheduler
+) -> list[tuple[int, float]]:
+    """(file size, latency) of every job, claimed in the order of `scheduler`."""
+    latencies: list[tuple[int, float]] = []
+    queued: list[tuple[float, int]] = []
+    # (time a slot is free at, job it finishes)
+    free_at: list[tuple[float, int | None]] = [(0.0, None)] * slots
+    next_job = 0
+    while next_job < len(jobs) or queued:
+        now, finished = heapq.heappop(free_at)
+        if finished is not None:
+            queued_at, size, parse_seconds = jobs[finished]
+            scheduler.observe("ifc", size, parse_seconds)
+            latencies.append((size, now - queued_at))
+        if not queued and next_job < len(jobs):
+            now = max(now, jobs[next_job][0])
+        while next_job < len(jobs) and jobs[next_job][0] <= now:
+            queued.append((jobs[next_job][0], next_job))
+            next_job += 1
+        # the order of the claim query, see `repository.get_next_jobs`
+        delay_per_byte = scheduler.delay_per_byte("ifc")
+        claimed = min(
+            range(len(queued)),
+            key=lambda i: queued[i][0] + jobs[queued[i][1]][1] * delay_per_byte,
+        )
+        _, index = queued.pop(claimed)
+        heapq.heappush(free_at, (now + jobs[index][2], index))
+    for now, finished in free_at:
+        if finished is not None:
+            queued_at, size, _ = jobs[finished]
+            latencies.append((size, now - queued_at))
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--jobs", type=int, default=2000)
+    parser.add_argument("--slots", type=int, default=1)
+    parser.add_argument("--load", type=float, default=0.8)
+    parser.add_argument("--mb-per-second", type=float, default=2.0)
+    parser.add_argument(
+        "--aging-factors", type=float, nargs="+", default=[0.5, 1.0, 4.0]
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    jobs = generate_jobs(
+        args.jobs, args.load, args.slots, args.mb_per_second * MB, args.seed
+    )
+    runs = [(SchedulingPolicy.FIFO, 1.0)] + [
+        (SchedulingPolicy.SHORTEST_FIRST, aging_factor)
+        for aging_factor in args.aging_factors
+    ]
+    print(
+        f"{args.jobs} jobs, {args.slots} slots, load {args.load}, "
+        f"{sum(size >= LARGE_JOB_BYTES for _, size, _ in jobs)} jobs of 1GB and up"
+    )
+    print(
+        f"{'policy':>26} {'p50 (s)':>9} {'p95 (s)':>9} {'max (s)':>9}"
+        f" {'large p50 (s)':>14} {'large max (s)':>14}"
+    )
+    for policy, aging_factor in runs:
+        # the scheduler starts from the default parse rate, as a new instance does
+        scheduler = JobScheduler(policy, aging_factor, 1.0 * MB)
+        results = simulate(jobs, args.slots, scheduler)
+        latencies = sorted(latency for _, latency in results)
+        large = sorted(
+            latency for size, latency in results if size >= LARGE_JOB_BYTES
+        ) or [0.0]
+        quantiles = statistics.quantiles(latencies, n=100)
+        name = policy.value
+        if policy == SchedulingPolicy.SHORTEST_FIRST:
+            name += f" (aging {aging_factor:g})"
+        print(
+            f"{name:>26} {quantiles[49]:9.1f} {quantiles[94]:9.1f}"
+            f" {latencies[-1]:9.1f} {statistics.median(large):14.1f}"
+            f" {large[-1]:14.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
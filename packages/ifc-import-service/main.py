@@ -1,37 +1,12 @@
 import asyncio
-import logging
-import sys
+import signal
 from http.server import BaseHTTPRequestHandler, HTTPServer
 from multiprocessing import Process
 
-import structlog
 from prometheus_client import start_http_server
-from structlog_to_seq import CelfProcessor
 
 from ifc_importer.job_manager import job_manager
-
-
-def configure_logger() -> structlog.stdlib.BoundLogger:
-    logging.basicConfig(format="%(message)s", stream=sys.stdout, level=logging.DEBUG)
-
-    structlog.configure(
-        logger_factory=structlog.stdlib.LoggerFactory(),
-        wrapper_class=structlog.stdlib.BoundLogger,
-        processors=[
-            # Prevent exception formatting if logging is not configured
-            # Add file, line, function information of where log occurred
-            # Add a timestamp to log message
-            structlog.processors.TimeStamper(fmt="iso", utc=True),
-            structlog.processors.StackInfoRenderer(),
-            structlog.processors.format_exc_info,
-            structlog.stdlib.add_log_level,
-            CelfProcessor(),
-            structlog.processors.UnicodeDecoder(),
-            structlog.processors.JSONRenderer(),
-        ],
-    )
-    logger = structlog.stdlib.get_logger()
-    return logger
+from ifc_importer.logger import configure_logger
 
 
 class HealthcheckHTTPRequestHandler(BaseHTTPRequestHandler):
@@ -55,11 +30,17 @@ async def main():
     healthcheck_server_process.start()
     start_http_server(9093)
 
-    # we do not need any sort of signal handling logic,
-    # cause if the context of the job transaction exits,
-    # the job gets back into a queue-d state
+    # Stopping the container cancels the job manager, which returns the jobs
+    # claimed ahead of time to the queue before exiting. Without the handlers the
+    # process would exit without running its cleanup.
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, task.cancel)
+
     try:
         await task
+    except asyncio.CancelledError:
+        logger.info("shutting down, claimed jobs were returned to the queue")
     except Exception as ex:
         logger.error(
             "Execution failed with exception: {message}", message=str(ex), exc_info=ex
@@ -0,0 +1,109 @@
+"""
+Node-local cache of the files downloaded for jobs, so retries and re-imports of a
+file do not download it again.
+
+Files are stored once per content hash in `objects/`, `blobs/<project>/<blob>`
+records the content hash of each blob. The directory can be shared by the service
+instances on a node, every write is atomic and a file evicted by another instance
+is just a miss.
+"""
+
+import contextlib
+import hashlib
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from ifc_importer import metrics
+from ifc_importer.domain import FileimportPayload
+
+
+class BlobCache:
+    """Least recently used cache of downloaded files, limited to `max_bytes`."""
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self._objects = directory.joinpath("objects")
+        self._blobs = directory.joinpath("blobs")
+        self._max_bytes = max_bytes
+        self._objects.mkdir(parents=True, exist_ok=True)
+        self._blobs.mkdir(parents=True, exist_ok=True)
+        metrics.blob_cache_bytes.set_function(self._size)
+
+    def _blob_path(self, job_payload: FileimportPayload) -> Path:
+        return self._blobs.joinpath(job_payload.project_id, job_payload.blob_id)
+
+    def restore(self, job_payload: FileimportPayload, work_dir: Path) -> bool:
+        """Place the file of the job in the work dir, returns False on a miss."""
+        try:
+            digest = self._blob_path(job_payload).read_text()
+            cached = self._objects.joinpath(digest)
+            _link_or_copy(cached, work_dir.joinpath(job_payload.file_name))
+            # the access time is not updated on every mount, the mtime is the
+            # last use
+            os.utime(cached)
+        except FileNotFoundError:
+            metrics.blob_cache_requests.labels(result="miss").inc()
+            return False
+        metrics.blob_cache_requests.labels(result="hit").inc()
+        metrics.blob_cache_bytes_saved.inc(cached.stat().st_size)
+        return True
+
+    def add(self, job_payload: FileimportPayload, file_path: Path) -> None:
+        """Cache a downloaded file, evicting the least recently used ones."""
+        size = file_path.stat().st_size
+        if size > self._max_bytes:
+            return
+        with file_path.open("rb") as file:
+            digest = hashlib.file_digest(file, "sha256").hexdigest()
+        cached = self._objects.joinpath(digest)
+        if cached.exists():
+            os.utime(cached)
+        else:
+            with tempfile.TemporaryDirectory(dir=self._objects) as temp_dir:
+                temp_path = Path(temp_dir, digest)
+                _link_or_copy(file_path, temp_path)
+                temp_path.replace(cached)
+        blob_path = self._blob_path(job_payload)
+        blob_path.parent.mkdir(exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w", dir=blob_path.parent, delete=False
+        ) as blob_file:
+            _ = blob_file.write(digest)
+        Path(blob_file.name).replace(blob_path)
+        self._evict()
+
+    def _entries(self) -> list[tuple[float, int, Path]]:
+        """The last use, size and path of the cached files."""
+        entries: list[tuple[float, int, Path]] = []
+        for path in self._objects.iterdir():
+            # removed by another instance meanwhile
+            with contextlib.suppress(FileNotFoundError):
+                if path.is_file():
+                    stat = path.stat()
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self) -> None:
+        entries = self._entries()
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self._max_bytes:
+                break
+            # the blobs recording this content hash become misses
+            path.unlink(missing_ok=True)
+            total_size -= size
+            metrics.blob_cache_evictions.inc()
+
+
+def _link_or_copy(source: Path, target: Path) -> None:
+    # the cache and the work dirs are usually on the same filesystem
+    try:
+        target.hardlink_to(source)
+    except OSError as ex:
+        if isinstance(ex, FileNotFoundError):
+            raise
+        _ = shutil.copyfile(source, target)
@@ -1,3 +1,5 @@
+from pathlib import Path
+
 from specklepy.core.api.client import (  # pyright: ignore[reportMissingTypeStubs]
     SpeckleClient,
 )
@@ -24,3 +26,19 @@ def setup_client(job_payload: FileimportPayload) -> SpeckleClient:
         )
 
     return speckle_client
+
+
+def download_blob(
+    client: SpeckleClient, job_payload: FileimportPayload, work_dir: Path
+) -> Path:
+    """
+    Stream the file of the job to the work dir. It only appears under its name
+    once it is complete.
+    """
+    file_path = work_dir.joinpath(job_payload.file_name)
+    partial_path = client.file_import.download_file(
+        job_payload.project_id,
+        job_payload.blob_id,
+        file_path.with_name(file_path.name + ".part"),
+    )
+    return partial_path.replace(file_path)
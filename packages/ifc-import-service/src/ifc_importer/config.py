@@ -19,6 +19,46 @@ class Settings:
     fileimport_queue_postgres_url: ts.SecretStr = ts.SecretStr()
     """PostgreSQL connection URL for the file import queue database."""
 
+    db_health_check_interval_seconds: int = 30
+    """Interval between health checks of the connection listening for new jobs."""
+
+    job_slots: int = 0
+    """Number of jobs processed concurrently, 0 sizes it from the CPUs and memory."""
+
+    job_claim_batch_size: int = 1
+    """Number of jobs claimed at once, the ones not started yet wait locally."""
+
+    job_prefetch_downloads: bool = False
+    """Download the files of the jobs waiting locally while the slots are busy."""
+
+    job_scheduling: str = "fifo"
+    """Claim order of the jobs, `fifo` or `shortest_first` (see `scheduling`)."""
+
+    job_scheduling_aging_factor: float = 1.0
+    """With `shortest_first`, jobs queued up to a job's estimated parse time
+    divided by this after it can be claimed before it."""
+
+    job_scheduling_default_mb_per_second: float = 1.0
+    """Parse rate assumed for a file type until a job of it succeeded."""
+
+    job_poll_max_interval_seconds: int = 30
+    """Longest interval between polls for jobs, which back off when idle."""
+
+    blob_cache_dir: str = ""
+    """Directory caching downloaded files, shared on a node, empty disables it."""
+
+    blob_cache_max_mb: int = 10240
+    """Size in MB above which the least recently used cached files are evicted."""
+
+    conversion_memo_path: str = ""
+    """SQLite database remembering the objects sent per file, empty disables it."""
+
+    worker_max_jobs: int = 20
+    """Number of jobs a worker process runs before it is replaced."""
+
+    worker_max_rss_mb: int = 4096
+    """Peak memory (RSS) in MB above which a worker process is replaced."""
+
 
 # Load settings with no prefix for environment variables
 # This maintains compatibility with the previous Dynaconf configuration
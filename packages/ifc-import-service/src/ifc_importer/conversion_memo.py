@@ -0,0 +1,113 @@
+"""
+Memo of the root object ids sent for converted files. A file imported again into
+the same project only needs a new version of the objects already on the server,
+instead of being converted and sent again.
+"""
+
+import hashlib
+import importlib.metadata
+import json
+import sqlite3
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+import structlog
+from specklepy.core.api.models.current import Version
+
+from ifc_importer.domain import FileimportPayload
+
+
+def conversion_key(job_payload: FileimportPayload, file_path: Path) -> str:
+    """
+    Identify a conversion by the content of the file, the converter version, and
+    the project its objects were sent to.
+    """
+    with file_path.open("rb") as file:
+        digest = hashlib.file_digest(file, "sha256").hexdigest()
+    return json.dumps(
+        [
+            job_payload.server_url,
+            job_payload.project_id,
+            digest,
+            # speckleifc is released with specklepy
+            importlib.metadata.version("specklepy"),
+            job_payload.file_name,
+        ]
+    )
+
+
+class ConversionMemo:
+    """SQLite backed memo, which the workers of the instances on a node can share."""
+
+    def __init__(self, path: str):
+        self._connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        _ = self._connection.execute("PRAGMA journal_mode=WAL")
+        _ = self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS conversions (
+                key TEXT PRIMARY KEY,
+                object_id TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+
+    def get(self, key: str) -> str | None:
+        row = self._connection.execute(
+            "SELECT object_id FROM conversions WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, object_id: str) -> None:
+        _ = self._connection.execute(
+            "INSERT OR REPLACE INTO conversions VALUES (?, ?, ?)",
+            (key, object_id, time.time()),
+        )
+
+    def forget(self, key: str) -> None:
+        _ = self._connection.execute("DELETE FROM conversions WHERE key = ?", (key,))
+
+
+def memoized_convert(
+    logger: structlog.stdlib.BoundLogger,
+    memo_path: str,
+    key: Callable[[], str],
+    convert: Callable[[], Version],
+    create_version: Callable[[str], Version],
+) -> Version:
+    """
+    Create a version of the objects converted for the same `key` before, or
+    `convert` the file and remember the root object id of its version. Falls back
+    to converting if the memoized objects cannot be used anymore. `key` is only
+    computed if the memo is enabled.
+
+    The fileimport-service importers ship separately and have their own copy of
+    this flow, `conversion_memo.memoized_send`, change them together.
+    """
+    if not memo_path:
+        return convert()
+
+    memo = ConversionMemo(memo_path)
+    conversion = key()
+    object_id = memo.get(conversion)
+    if object_id:
+        logger.info(
+            "reusing the objects {object_id} of an identical import",
+            object_id=object_id,
+        )
+        try:
+            return create_version(object_id)
+        except Exception as ex:
+            # e.g. the objects were deleted from the server
+            logger.warning(
+                "could not reuse the objects {object_id} of an identical import",
+                object_id=object_id,
+                exc_info=ex,
+            )
+            memo.forget(conversion)
+
+    version = convert()
+    if version.referenced_object:
+        memo.set(conversion, version.referenced_object)
+    return version
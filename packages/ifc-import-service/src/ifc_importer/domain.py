@@ -24,6 +24,7 @@ class FileimportPayload(JobBase):
     blob_id: str
     file_type: str
     file_name: str
+    file_size: int | None = None
     time_out_seconds: int
 
 
@@ -1,11 +1,13 @@
 import asyncio
-import base64
+import os
 import tempfile
 import time
+from collections import deque
 from math import floor
 from pathlib import Path
 
 import structlog
+from asyncpg import Pool
 from specklepy.core.api.inputs.file_import_inputs import (
     FileImportErrorInput,
     FileImportResult,
@@ -13,28 +15,293 @@ from specklepy.core.api.inputs.file_import_inputs import (
 )
 from specklepy.logging import metrics
 
-from ifc_importer.client import setup_client
-from ifc_importer.domain import FileimportError, FileimportResult, JobStatus
+from ifc_importer.blob_cache import BlobCache
+from ifc_importer.client import download_blob, setup_client
+from ifc_importer.config import settings
+from ifc_importer.domain import (
+    FileimportError,
+    FileimportJob,
+    FileimportPayload,
+    FileimportResult,
+    JobStatus,
+)
+from ifc_importer.metrics import job_parse_rate_bytes_per_second
 from ifc_importer.repository import (
+    CONNECTION_ERRORS,
     deduct_from_compute_budget,
-    get_next_job,
+    get_next_jobs,
+    listen_for_new_jobs,
+    release_jobs,
     return_job_to_queued,
-    setup_connection,
+    setup_pool,
+    start_job,
 )
+from ifc_importer.scheduling import JobScheduler, SchedulingPolicy
+from ifc_importer.worker_pool import WorkerPool
 
 IDLE_TIMEOUT = 1
 
 
+class JobWakeup:
+    """Wakes up the idle job slots when a new job is queued."""
+
+    def __init__(self):
+        self.generation = 0
+        self._event = asyncio.Event()
+
+    def notify(self) -> None:
+        self.generation += 1
+        self._event.set()
+        self._event = asyncio.Event()
+
+    async def wait(self, generation: int, idle_timeout: float) -> bool:
+        """
+        Wait for a job queued after `generation` was read, returns False if none
+        was queued within `idle_timeout` seconds.
+        """
+        if generation != self.generation:
+            return True
+        try:
+            _ = await asyncio.wait_for(self._event.wait(), idle_timeout)
+            return True
+        except TimeoutError:
+            return False
+
+
+class PrefetchedDownload:
+    """The file of a job waiting locally, downloaded ahead of time to its work dir."""
+
+    def __init__(self, job: FileimportJob, blob_cache: BlobCache | None):
+        self.work_dir = tempfile.TemporaryDirectory(ignore_cleanup_errors=True)
+        self.from_cache = False
+        self._task = asyncio.create_task(
+            asyncio.to_thread(
+                self._download, job.payload, Path(self.work_dir.name), blob_cache
+            )
+        )
+
+    def _download(
+        self,
+        job_payload: FileimportPayload,
+        work_dir: Path,
+        blob_cache: BlobCache | None,
+    ) -> None:
+        if blob_cache:
+            self.from_cache = blob_cache.restore(job_payload, work_dir)
+        if not self.from_cache:
+            _ = download_blob(setup_client(job_payload), job_payload, work_dir)
+
+    async def wait(self, logger: structlog.stdlib.BoundLogger, job_timeout: float):
+        """Wait for the download to finish, raises TimeoutError if it does not."""
+        done, _ = await asyncio.wait([self._task], timeout=job_timeout)
+        if not done:
+            raise TimeoutError()
+        if ex := self._task.exception():
+            logger.warning("prefetching the job file failed", exc_info=ex)
+
+    def discard(self) -> None:
+        # the download thread cannot be interrupted, the work dir is removed once
+        # it is finished with it
+        self._task.add_done_callback(self._cleanup)
+
+    def _cleanup(self, task: asyncio.Task[None]) -> None:
+        # a failed download does not matter anymore
+        _ = task.cancelled() or task.exception()
+        self.work_dir.cleanup()
+
+
+class ClaimedJobs:
+    """
+    Hands out jobs to the job slots. Jobs are claimed from the database in batches
+    of `batch_size`, the jobs not handed out right away wait in a local queue.
+    """
+
+    def __init__(
+        self,
+        db: Pool,
+        batch_size: int,
+        wakeup: JobWakeup,
+        prefetch_downloads: bool,
+        blob_cache: BlobCache | None,
+        scheduler: JobScheduler,
+    ):
+        self._db = db
+        self._batch_size = batch_size
+        self._scheduler = scheduler
+        self._wakeup = wakeup
+        self._prefetch_downloads = prefetch_downloads
+        self._blob_cache = blob_cache
+        self._jobs: deque[tuple[FileimportJob, PrefetchedDownload | None]] = deque()
+        self._lock = asyncio.Lock()
+
+    async def next(self) -> tuple[FileimportJob, PrefetchedDownload | None] | None:
+        """The next job, and the download of its file if it was prefetched."""
+        async with self._lock:
+            while self._jobs:
+                job, prefetch = self._jobs.popleft()
+                # its timeout started when it was claimed
+                if await start_job(self._db, job):
+                    return job, prefetch
+                if prefetch:
+                    prefetch.discard()
+
+            jobs = await get_next_jobs(
+                self._db, self._batch_size, self._scheduler.delay_per_byte("ifc")
+            )
+            if not jobs:
+                return None
+            for job in jobs[1:]:
+                prefetch = (
+                    PrefetchedDownload(job, self._blob_cache)
+                    if self._prefetch_downloads
+                    else None
+                )
+                self._jobs.append((job, prefetch))
+            if self._jobs:
+                # the idle slots can take these right away
+                self._wakeup.notify()
+            return jobs[0], None
+
+    async def release(self, logger: structlog.stdlib.BoundLogger) -> None:
+        """Return the jobs which were never handed out to the queue."""
+        async with self._lock:
+            if self._jobs:
+                await release_jobs(self._db, logger, [job for job, _ in self._jobs])
+            for _, prefetch in self._jobs:
+                if prefetch:
+                    prefetch.discard()
+            self._jobs.clear()
+
+
+def default_job_slots(worker_max_rss_mb: int) -> int:
+    """One slot per available CPU, as long as every worker fits in memory."""
+    cpus = len(os.sched_getaffinity(0))
+    memory_mb = os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // 2**20
+    # the container memory limit, if there is one
+    cgroup_limit = Path("/sys/fs/cgroup/memory.max")
+    if cgroup_limit.exists() and cgroup_limit.read_text().strip().isdigit():
+        memory_mb = min(memory_mb, int(cgroup_limit.read_text()) // 2**20)
+    return max(1, min(cpus, memory_mb // worker_max_rss_mb))
+
+
 async def job_manager(logger: structlog.stdlib.BoundLogger):
     parser = "speckle_ifc"
     logger = logger.bind(parser=parser)
-    connection = await setup_connection()
-    logger.info("job processor started")
+    slots = settings.job_slots or default_job_slots(settings.worker_max_rss_mb)
+    pool = WorkerPool(
+        logger,
+        max_jobs=settings.worker_max_jobs,
+        max_rss_mb=settings.worker_max_rss_mb,
+    )
+    await pool.start(slots)
+    # every slot uses at most one connection at a time
+    db = await setup_pool(max_size=slots)
+    wakeup = JobWakeup()
+    blob_cache = (
+        BlobCache(Path(settings.blob_cache_dir), settings.blob_cache_max_mb * 2**20)
+        if settings.blob_cache_dir
+        else None
+    )
+    scheduler = JobScheduler(
+        SchedulingPolicy(settings.job_scheduling),
+        settings.job_scheduling_aging_factor,
+        settings.job_scheduling_default_mb_per_second * 2**20,
+    )
+    claimed_jobs = ClaimedJobs(
+        db,
+        settings.job_claim_batch_size,
+        wakeup,
+        settings.job_prefetch_downloads,
+        blob_cache,
+        scheduler,
+    )
+    logger.info("job processor started with {slots} job slots", slots=slots)
+    try:
+        # every slot takes and runs jobs on its own
+        async with asyncio.TaskGroup() as task_group:
+            _ = task_group.create_task(listen_for_new_jobs(logger, wakeup.notify))
+            for slot in range(slots):
+                _ = task_group.create_task(
+                    _process_jobs(
+                        logger.bind(slot=slot),
+                        parser,
+                        db,
+                        claimed_jobs,
+                        pool,
+                        wakeup,
+                        blob_cache,
+                        scheduler,
+                    )
+                )
+    finally:
+        await claimed_jobs.release(logger)
+        await pool.close()
+        await db.close()
+
+
+async def _cache_file(
+    logger: structlog.stdlib.BoundLogger,
+    blob_cache: BlobCache,
+    job_payload: FileimportPayload,
+    work_dir: str,
+) -> None:
+    file_path = Path(work_dir, job_payload.file_name)
+    try:
+        if await asyncio.to_thread(file_path.exists):
+            await asyncio.to_thread(blob_cache.add, job_payload, file_path)
+    except OSError as ex:
+        logger.warning("could not cache the job file", exc_info=ex)
+
+
+def _observe_parse_rate(
+    scheduler: JobScheduler,
+    job_payload: FileimportPayload,
+    work_dir: str,
+    parse_seconds: float,
+) -> None:
+    file_size = job_payload.file_size
+    file_path = Path(work_dir, job_payload.file_name)
+    # jobs queued before the payloads had a file size
+    if file_size is None and file_path.exists():
+        file_size = file_path.stat().st_size
+    if file_size is None:
+        return
+    scheduler.observe(job_payload.file_type, file_size, parse_seconds)
+    job_parse_rate_bytes_per_second.labels(job_payload.file_type.lower()).set(
+        scheduler.bytes_per_second(job_payload.file_type)
+    )
+
+
+async def _process_jobs(
+    logger: structlog.stdlib.BoundLogger,
+    parser: str,
+    db: Pool,
+    claimed_jobs: ClaimedJobs,
+    pool: WorkerPool,
+    wakeup: JobWakeup,
+    blob_cache: BlobCache | None,
+    scheduler: JobScheduler,
+):
+    idle_timeout = IDLE_TIMEOUT
     while True:
-        job = await get_next_job(connection)
-        if not job:
-            await asyncio.sleep(IDLE_TIMEOUT)
+        generation = wakeup.generation
+        try:
+            claimed = await claimed_jobs.next()
+        except CONNECTION_ERRORS as ex:
+            # queries are not retried, jobs claimed by a lost query time out and
+            # are claimed again
+            logger.warning("could not claim jobs", exc_info=ex)
+            claimed = None
+        if not claimed:
+            # new jobs wake the slot up, the backing off poll picks up the jobs
+            # which timed out in a PROCESSING state
+            if not await wakeup.wait(generation, idle_timeout):
+                idle_timeout = min(
+                    idle_timeout * 2, settings.job_poll_max_interval_seconds
+                )
             continue
+        idle_timeout = IDLE_TIMEOUT
+        job, prefetch = claimed
 
         start = time.time()
         duration = 0
@@ -47,7 +314,9 @@ async def job_manager(logger: structlog.stdlib.BoundLogger):
         metrics.METRICS_TRACKER = None
         metrics.HOST_APP = "ifc"
 
-        speckle_client = setup_client(job.payload)
+        # the client calls are blocking, they run in threads so they do not stall
+        # the other slots and the job listener on the event loop
+        speckle_client = await asyncio.to_thread(setup_client, job.payload)
 
         job_id = job.id
         job_status = JobStatus.QUEUED
@@ -57,7 +326,9 @@ async def job_manager(logger: structlog.stdlib.BoundLogger):
 
         # this will create a new temp directory and also delete it,
         #  when the with block closes
-        with tempfile.TemporaryDirectory() as temp_dir:
+        with (
+            prefetch.work_dir if prefetch else tempfile.TemporaryDirectory() as temp_dir
+        ):
             try:
                 # i do not get this why are we handling this here?
                 if attempt > job.max_attempt:
@@ -77,32 +348,33 @@ async def job_manager(logger: structlog.stdlib.BoundLogger):
                     remaining_compute_budget_seconds=job.remaining_compute_budget_seconds,
                     job_timeout=job_timeout,
                 )
-                cmd = (
-                    f"python job_processor.py {temp_dir}"
-                    + f" {
-                        base64.b64encode(
-                            job.payload.model_dump_json().encode()
-                        ).decode()
-                    }"
-                )
-                # subprocess
-                process = await asyncio.create_subprocess_shell(
-                    cmd,
-                )
+                download_wait = 0.0
+                from_cache = False
                 try:
-                    exit_code = await asyncio.wait_for(
-                        process.wait(), timeout=job_timeout
+                    if prefetch:
+                        await prefetch.wait(logger, job_timeout)
+                        download_wait = time.time() - start
+                        from_cache = prefetch.from_cache
+                    elif blob_cache:
+                        from_cache = await asyncio.to_thread(
+                            blob_cache.restore, job.payload, Path(temp_dir)
+                        )
+                    await pool.run_job(
+                        temp_dir,
+                        job.payload.model_dump_json(),
+                        max(1, job_timeout - download_wait),
                     )
                 except TimeoutError as te:
-                    process.kill()
                     raise Exception(
                         "Job was cancelled due to reaching the"
                         + f" {job_timeout} second timeout"
                     ) from te
-                # this should never happen, as the job processor is handling errors
-                # when the process is killed with a timeout we raise a TimeoutError
-                if exit_code != 0:
-                    raise Exception(f"Job failed with exit code {exit_code}")
+                finally:
+                    if blob_cache and not from_cache:
+                        # cached whatever the outcome, a retry of a timed out or
+                        # crashed job reuses it. The file only appears under its
+                        # name once it is downloaded completely.
+                        await _cache_file(logger, blob_cache, job.payload, temp_dir)
 
                 result_path = Path(temp_dir, "result.json")
                 if not result_path.exists():
@@ -129,6 +401,9 @@ async def job_manager(logger: structlog.stdlib.BoundLogger):
                 #     handler, timeout=job_timeout
                 # )
                 version_id = outcome.version_id
+                _observe_parse_rate(
+                    scheduler, job.payload, temp_dir, outcome.parse_duration_seconds
+                )
 
                 duration = time.time() - start
                 logger.info(
@@ -138,7 +413,8 @@ async def job_manager(logger: structlog.stdlib.BoundLogger):
                     version_id=version_id,
                 )
 
-                _ = speckle_client.file_import.finish_file_import_job(
+                _ = await asyncio.to_thread(
+                    speckle_client.file_import.finish_file_import_job,
                     FileImportSuccessInput(
                         project_id=job.payload.project_id,
                         # the blob id identifies the "job" here
@@ -146,11 +422,12 @@ async def job_manager(logger: structlog.stdlib.BoundLogger):
                         result=FileImportResult(
                             parser=parser,
                             version_id=version_id,
-                            download_duration_seconds=outcome.download_duration_seconds,
+                            download_duration_seconds=download_wait
+                            + outcome.download_duration_seconds,
                             duration_seconds=duration,
                             parse_duration_seconds=outcome.parse_duration_seconds,
                         ),
-                    )
+                    ),
                 )
                 # the server is responsible for moving successful
                 # jobs to the succeeded state
@@ -168,15 +445,21 @@ async def job_manager(logger: structlog.stdlib.BoundLogger):
                     # it probably failed before we calculated the duration,
                     # so calculate it now
                     duration = time.time() - start
-                    await deduct_from_compute_budget(
-                        connection, logger, job_id, floor(duration)
-                    )
+                    try:
+                        await deduct_from_compute_budget(
+                            db, logger, job_id, floor(duration)
+                        )
+                    except CONNECTION_ERRORS as db_ex:
+                        logger.warning(
+                            "could not deduct from the compute budget", exc_info=db_ex
+                        )
 
                 if job_status == JobStatus.FAILED:
                     # we should be reporting the failure to the server
                     logger.error("job processing failed", exc_info=ex)
                     try:
-                        _ = speckle_client.file_import.finish_file_import_job(
+                        _ = await asyncio.to_thread(
+                            speckle_client.file_import.finish_file_import_job,
                             FileImportErrorInput(
                                 project_id=job.payload.project_id,
                                 # the blob id identifies the job to the server
@@ -189,7 +472,7 @@ async def job_manager(logger: structlog.stdlib.BoundLogger):
                                     duration_seconds=time.time() - start,
                                     parse_duration_seconds=0,
                                 ),
-                            )
+                            ),
                         )
                         # the server is responsible for moving failed jobs to the
                         # failed state
@@ -203,7 +486,13 @@ async def job_manager(logger: structlog.stdlib.BoundLogger):
                         # The server is responsible for garbage collecting jobs
                         # which have reached these error conditions and moving
                         # them to a failed status.
-                        await return_job_to_queued(connection, logger, job_id)
+                        try:
+                            await return_job_to_queued(db, logger, job_id)
+                        except CONNECTION_ERRORS as db_ex:
+                            # it times out in the processing state instead
+                            logger.warning(
+                                "could not return the job to queued", exc_info=db_ex
+                            )
                 elif job_status == JobStatus.SUCCEEDED:
                     # do nothing
                     # we expect the job to already be marked as succeeded in the
@@ -0,0 +1,28 @@
+import logging
+import sys
+
+import structlog
+from structlog_to_seq import CelfProcessor
+
+
+def configure_logger() -> structlog.stdlib.BoundLogger:
+    logging.basicConfig(format="%(message)s", stream=sys.stdout, level=logging.DEBUG)
+
+    structlog.configure(
+        logger_factory=structlog.stdlib.LoggerFactory(),
+        wrapper_class=structlog.stdlib.BoundLogger,
+        processors=[
+            # Prevent exception formatting if logging is not configured
+            # Add file, line, function information of where log occurred
+            # Add a timestamp to log message
+            structlog.processors.TimeStamper(fmt="iso", utc=True),
+            structlog.processors.StackInfoRenderer(),
+            structlog.processors.format_exc_info,
+            structlog.stdlib.add_log_level,
+            CelfProcessor(),
+            structlog.processors.UnicodeDecoder(),
+            structlog.processors.JSONRenderer(),
+        ],
+    )
+    logger = structlog.stdlib.get_logger()
+    return logger
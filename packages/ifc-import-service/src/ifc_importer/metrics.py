@@ -0,0 +1,66 @@
+"""Prometheus metrics of the IFC importer, served on port 9093 by `main.py`."""
+
+from prometheus_client import Counter, Gauge, Histogram
+
+worker_cold_start_seconds = Gauge(
+    "ifc_importer_worker_cold_start_seconds",
+    "Time for a fresh interpreter to import the job processing modules",
+)
+worker_startup_seconds_saved = Counter(
+    "ifc_importer_worker_startup_seconds_saved_total",
+    "Interpreter startup time saved by running jobs on already warm workers",
+)
+worker_jobs = Counter(
+    "ifc_importer_worker_jobs_total",
+    "Jobs handed to the worker pool",
+)
+worker_recycles = Counter(
+    "ifc_importer_worker_recycles_total",
+    "Workers replaced by the worker pool",
+    ["reason"],
+)
+
+job_parse_rate_bytes_per_second = Gauge(
+    "ifc_importer_job_parse_rate_bytes_per_second",
+    "Average parse rate of the jobs, which estimates the parse time of queued jobs",
+    ["file_type"],
+)
+
+db_pool_acquire_seconds = Histogram(
+    "ifc_importer_db_pool_acquire_seconds",
+    "Time to acquire a connection from the database pool",
+)
+db_pool_waiting = Gauge(
+    "ifc_importer_db_pool_waiting",
+    "Queries waiting for a connection from the database pool",
+)
+db_pool_size = Gauge(
+    "ifc_importer_db_pool_size",
+    "Connections opened by the database pool",
+)
+db_pool_idle = Gauge(
+    "ifc_importer_db_pool_idle",
+    "Idle connections of the database pool",
+)
+db_reconnects = Counter(
+    "ifc_importer_db_reconnects_total",
+    "Database operations retried, or listeners reconnected, after a lost connection",
+)
+
+blob_cache_requests = Counter(
+    "ifc_importer_blob_cache_requests_total",
+    "Lookups of job files in the blob cache",
+    ["result"],
+)
+blob_cache_bytes_saved = Counter(
+    "ifc_importer_blob_cache_bytes_saved_total",
+    "Bytes not downloaded thanks to the blob cache",
+)
+blob_cache_evictions = Counter(
+    "ifc_importer_blob_cache_evictions_total",
+    "Files evicted from the blob cache",
+)
+blob_cache_bytes = Gauge(
+    "ifc_importer_blob_cache_bytes",
+    "Size of the files in the blob cache",
+)
@@ -3,10 +3,14 @@ import traceback
 from pathlib import Path
 from pprint import pprint
 
+import structlog
 from speckleifc.main import open_and_convert_file
+from specklepy.core.api.inputs.version_inputs import CreateVersionInput
 from specklepy.logging import metrics
 
-from ifc_importer.client import setup_client
+from ifc_importer.client import download_blob, setup_client
+from ifc_importer.config import settings
+from ifc_importer.conversion_memo import conversion_key, memoized_convert
 from ifc_importer.domain import (
     FileimportError,
     FileimportPayload,
@@ -33,19 +37,39 @@ def process_job(
 
         client = setup_client(job)
 
-        file_path = client.file_import.download_file(
-            job.project_id, job.blob_id, work_dir.joinpath(job.file_name)
-        )
+        file_path = work_dir.joinpath(job.file_name)
+        # unless the job manager downloaded it ahead of time
+        if not file_path.exists():
+            file_path = download_blob(client, job, work_dir)
         download_end = time.time()
         download_duration = download_end - start
         project = client.project.get(job.project_id)
 
-        version = open_and_convert_file(
-            file_path=str(file_path),
-            client=client,
-            project=project,
-            model_id=job.model_id,
-            version_message=f"Created from {job.file_name} upload.",
+        version_message = f"Created from {job.file_name} upload."
+
+        logger = structlog.stdlib.get_logger().bind(
+            project_id=job.project_id, blob_id=job.blob_id
+        )
+        version = memoized_convert(
+            logger,
+            settings.conversion_memo_path,
+            lambda: conversion_key(job, file_path),
+            lambda: open_and_convert_file(
+                file_path=str(file_path),
+                client=client,
+                project=project,
+                model_id=job.model_id,
+                version_message=version_message,
+            ),
+            lambda object_id: client.version.create(
+                CreateVersionInput(
+                    object_id=object_id,
+                    model_id=job.model_id,
+                    project_id=job.project_id,
+                    message=version_message,
+                    source_application=metrics.HOST_APP,
+                )
+            ),
         )
         parse_end = time.time()
         parse_duration = parse_end - download_end
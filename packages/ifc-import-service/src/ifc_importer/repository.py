@@ -1,75 +1,276 @@
+import asyncio
+import functools
 import json
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from typing import Concatenate
 
 import structlog
-from asyncpg import Connection, connect
+from asyncpg import (
+    Connection,
+    InterfaceError,
+    Pool,
+    PostgresConnectionError,
+    connect,
+    create_pool,
+)
 
+from ifc_importer import metrics
 from ifc_importer.config import settings
 from ifc_importer.domain import FileimportJob, JobStatus
 
+# notified by the background_jobs_notify_queued trigger when a job gets queued
+JOB_NOTIFY_CHANNEL = "background_jobs"
+HEALTH_CHECK_TIMEOUT = 10
+ACQUIRE_ATTEMPTS = 3
+# raised when a connection to the database is lost or cannot be made
+CONNECTION_ERRORS = (OSError, InterfaceError, PostgresConnectionError)
 
-async def setup_connection() -> Connection:
-    connection = await connect(settings.fileimport_queue_postgres_url)
+
+async def _init_connection(connection: Connection) -> None:
     await connection.set_type_codec(
         "jsonb",
         encoder=json.dumps,
         decoder=json.loads,
         schema="pg_catalog",
     )
+
+
+async def setup_connection() -> Connection:
+    connection = await connect(settings.fileimport_queue_postgres_url)
+    await _init_connection(connection)
     return connection
 
 
-async def get_next_job(connection: Connection) -> FileimportJob | None:
-    """Get a fileimport job from the connection."""
+async def setup_pool(max_size: int) -> Pool:
+    pool = await create_pool(
+        settings.fileimport_queue_postgres_url,
+        min_size=1,
+        max_size=max_size,
+        init=_init_connection,
+    )
+    metrics.db_pool_size.set_function(pool.get_size)
+    metrics.db_pool_idle.set_function(pool.get_idle_size)
+    return pool
 
-    job = await connection.fetchrow(
-        """
-        WITH next_job AS (
+
+async def _acquire_connection(pool: Pool) -> Connection:
+    """
+    Get a connection from the pool, retrying when it cannot connect. Nothing was
+    sent to the database yet, so this is always safe to retry.
+    """
+    for attempt in range(1, ACQUIRE_ATTEMPTS + 1):
+        try:
+            with metrics.db_pool_waiting.track_inprogress():
+                return await pool.acquire()
+        except CONNECTION_ERRORS:
+            if attempt == ACQUIRE_ATTEMPTS:
+                raise
+            metrics.db_reconnects.inc()
+            await asyncio.sleep(attempt)
+    raise AssertionError("unreachable")
+
+
+@asynccontextmanager
+async def _acquire(pool: Pool) -> AsyncIterator[Connection]:
+    start = time.monotonic()
+    connection = await _acquire_connection(pool)
+    metrics.db_pool_acquire_seconds.observe(time.monotonic() - start)
+    try:
+        yield connection
+    finally:
+        await pool.release(connection)
+
+
+def _with_pooled_connection[**P, T](
+    query: Callable[Concatenate[Connection, P], Awaitable[T]],
+) -> Callable[Concatenate[Pool, P], Awaitable[T]]:
+    """
+    Run `query` on a connection from the pool. Only getting the connection is
+    retried: a query whose connection was lost may have been committed already,
+    and the queries claiming jobs or deducting budgets must not run twice. asyncpg
+    closes the lost connection, so the next query gets a new one.
+    """
+
+    @functools.wraps(query)
+    async def wrapper(pool: Pool, *args: P.args, **kwargs: P.kwargs) -> T:
+        async with _acquire(pool) as connection:
+            return await query(connection, *args, **kwargs)
+
+    return wrapper
+
+
+async def listen_for_new_jobs(
+    logger: structlog.stdlib.BoundLogger, on_new_job: Callable[[], None]
+) -> None:
+    """
+    Call `on_new_job` whenever an IFC job is queued. Runs forever on a dedicated
+    connection, which is checked periodically and replaced when it is lost.
+    """
+
+    def listener(_connection: object, _pid: int, _channel: str, payload: str):
+        if json.loads(payload).get("fileType") == "ifc":
+            on_new_job()
+
+    while True:
+        try:
+            connection = await setup_connection()
+        except CONNECTION_ERRORS as ex:
+            logger.warning("could not connect to listen for jobs", exc_info=ex)
+            await asyncio.sleep(settings.db_health_check_interval_seconds)
+            continue
+
+        try:
+            await connection.add_listener(JOB_NOTIFY_CHANNEL, listener)
+            # jobs queued while not listening were not notified
+            on_new_job()
+            while True:
+                await asyncio.sleep(settings.db_health_check_interval_seconds)
+                _ = await connection.fetchval("SELECT 1", timeout=HEALTH_CHECK_TIMEOUT)
+        except (*CONNECTION_ERRORS, TimeoutError) as ex:
+            metrics.db_reconnects.inc()
+            logger.warning("lost the connection listening for jobs", exc_info=ex)
+        finally:
+            connection.terminate()
+
+
+async def get_next_job(pool: Pool) -> FileimportJob | None:
+    """Get a fileimport job from the pool."""
+    jobs = await get_next_jobs(pool, 1)
+    return jobs[0] if jobs else None
+
+
+# Claim order of the jobs. Oldest first is served by the claim indexes, the size
+# aware order pushes the queue time of a job back by $3 seconds per byte of its file
+_OLDEST_FIRST = '"createdAt"'
+_SIZE_AWARE = (
+    "\"createdAt\" + COALESCE((payload ->> 'fileSize')::bigint, 0)"
+    " * $3::float8 * interval '1 second'"
+)
+
+
+@_with_pooled_connection
+async def get_next_jobs(
+    connection: Connection, limit: int, delay_per_byte: float = 0.0
+) -> list[FileimportJob]:
+    """
+    Claim up to `limit` fileimport jobs, oldest first. With a `delay_per_byte`,
+    the queue time of every job is pushed back by that many seconds per byte of
+    its file, see `scheduling`.
+    """
+    priority = _SIZE_AWARE if delay_per_byte > 0 else _OLDEST_FIRST
+    size_args = [delay_per_byte] if delay_per_byte > 0 else []
+
+    jobs = await connection.fetch(
+        # Each branch is served by a partial index on the fileType of the jobs in
+        # that state (see the background_jobs_claim_indexes migration). The states
+        # are literals, so the planner can match them with the index predicates.
+        f"""
+        WITH queued_jobs AS ( -- jobs in a QUEUED state which has not yet
+                              -- exceeded maximum attempts
+                              -- and have a positive remaining compute budget
+            SELECT id, {priority} AS priority FROM background_jobs
+            WHERE payload ->> 'fileType' = 'ifc'
+                AND status = 'queued'
+                AND "attempt" < "maxAttempt"
+                AND "remainingComputeBudgetSeconds"::int > 0
+            ORDER BY priority
+            FOR UPDATE SKIP LOCKED
+            LIMIT $2
+        ),
+        timed_out_jobs AS ( -- any jobs left in a PROCESSING state
+                            -- for more than their timeout period
+            SELECT id, {priority} AS priority FROM background_jobs
+            WHERE payload ->> 'fileType' = 'ifc'
+                AND status = 'processing'
+                AND "attempt" <= "maxAttempt"
+                AND "updatedAt" < NOW() - (payload ->> 'timeOutSeconds')::int
+                    * interval '1 second'
+            ORDER BY priority
+            FOR UPDATE SKIP LOCKED
+            LIMIT $2
+        ),
+        next_jobs AS (
             UPDATE background_jobs
             SET
                 "attempt" = "attempt" + 1,
                 "status" = $1,
                 "updatedAt" = NOW()
-            WHERE id = (
-                SELECT id FROM background_jobs
-                WHERE ( -- job in a QUEUED state which has not yet
-                        -- exceeded maximum attempts
-                        -- and has a positive remaining compute budget
-                    payload ->> 'fileType' = 'ifc'
-                    AND status = $2
-                    AND "attempt" < "maxAttempt"
-                    AND "remainingComputeBudgetSeconds"::int > 0
-                )
-                OR ( -- any job left in a PROCESSING state
-                     -- for more than its timeout period
-                    payload ->> 'fileType' = 'ifc'
-                    AND status = $1
-                    AND "attempt" <= "maxAttempt"
-                    AND "updatedAt" < NOW() - (payload ->> 'timeOutSeconds')::int
-                        * interval '1 second'
-                )
-                ORDER BY "createdAt"
-                FOR UPDATE SKIP LOCKED
-                LIMIT 1
+            WHERE id IN (
+                SELECT id FROM (
+                    SELECT * FROM queued_jobs UNION ALL SELECT * FROM timed_out_jobs
+                ) AS candidates
+                ORDER BY priority
+                LIMIT $2
             )
             RETURNING *
         )
-        SELECT * FROM next_job;
+        SELECT * FROM next_jobs ORDER BY {priority};
         """,
         JobStatus.PROCESSING.value,
+        limit,
+        *size_args,
+    )
+    return [FileimportJob.model_validate(dict(job)) for job in jobs]
+
+
+@_with_pooled_connection
+async def start_job(connection: Connection, job: FileimportJob) -> bool:
+    """
+    Restart the timeout of a job claimed ahead of time. Returns False if the job
+    timed out while waiting, and was claimed again by another worker.
+    """
+    result = await connection.execute(
+        """
+        UPDATE background_jobs
+        SET "updatedAt" = NOW()
+        WHERE id = $1 AND status = $2 AND "attempt" = $3
+        """,
+        job.id,
+        JobStatus.PROCESSING.value,
+        job.attempt,
+    )
+    return result == "UPDATE 1"
+
+
+@_with_pooled_connection
+async def release_jobs(
+    connection: Connection,
+    logger: structlog.stdlib.BoundLogger,
+    jobs: list[FileimportJob],
+) -> None:
+    """Return jobs claimed but never started to the queue, undoing their attempt."""
+    logger.info(
+        "returning unstarted jobs: {job_ids} to queued",
+        job_ids=[job.id for job in jobs],
+    )
+    _ = await connection.execute(
+        """
+        UPDATE background_jobs
+        SET status = $1,
+            "attempt" = "attempt" - 1,
+            "updatedAt" = NOW()
+        WHERE status = $2
+            AND (id, "attempt") IN (
+                SELECT * FROM unnest($3::text[], $4::int[])
+            )
+        """,
         JobStatus.QUEUED.value,
+        JobStatus.PROCESSING.value,
+        [job.id for job in jobs],
+        [job.attempt for job in jobs],
     )
-    if not job:
-        return None
-    return FileimportJob.model_validate(dict(job))
 
 
 async def return_job_to_queued(
-    connection: Connection, logger: structlog.stdlib.BoundLogger, job_id: str
+    pool: Pool, logger: structlog.stdlib.BoundLogger, job_id: str
 ) -> None:
     logger.info("returning job: {job_id} to queued", job_id=job_id)
-    return await set_job_status(connection, logger, job_id, JobStatus.QUEUED)
+    return await set_job_status(pool, logger, job_id, JobStatus.QUEUED)
 
 
+@_with_pooled_connection
 async def set_job_status(
     connection: Connection,
     logger: structlog.stdlib.BoundLogger,
@@ -93,6 +294,7 @@ async def set_job_status(
     )
 
 
+@_with_pooled_connection
 async def deduct_from_compute_budget(
     connection: Connection,
     logger: structlog.stdlib.BoundLogger,
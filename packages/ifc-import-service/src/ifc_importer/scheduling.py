@@ -0,0 +1,58 @@
+"""
+Order in which the queued jobs are claimed.
+
+`fifo` claims the oldest jobs first. `shortest_first` estimates the parse time of
+every job from the size of its file and the parse rate of the jobs of its file type
+processed so far, and claims jobs by their queue time pushed back by their estimated
+parse time divided by the aging factor. A large job only lets the jobs queued up to
+that long after it go first, so it cannot starve.
+"""
+
+from enum import StrEnum
+
+# Weight of the latest job in the average parse rate
+RATE_SMOOTHING = 0.2
+
+
+class SchedulingPolicy(StrEnum):
+    FIFO = "fifo"
+    SHORTEST_FIRST = "shortest_first"
+
+
+class JobScheduler:
+    def __init__(
+        self,
+        policy: SchedulingPolicy,
+        aging_factor: float,
+        default_bytes_per_second: float,
+    ):
+        if aging_factor <= 0 or default_bytes_per_second <= 0:
+            raise ValueError("the aging factor and parse rate must be positive")
+        self.policy = policy
+        self.aging_factor = aging_factor
+        self.default_bytes_per_second = default_bytes_per_second
+        self._bytes_per_second: dict[str, float] = {}
+
+    def bytes_per_second(self, file_type: str) -> float:
+        """The average parse rate of the jobs of `file_type`."""
+        return self._bytes_per_second.get(
+            file_type.lower(), self.default_bytes_per_second
+        )
+
+    def observe(self, file_type: str, file_size: int, parse_seconds: float) -> None:
+        """Update the parse rate of `file_type` with a job which succeeded."""
+        if file_size <= 0 or parse_seconds <= 0:
+            return
+        rate = self.bytes_per_second(file_type)
+        self._bytes_per_second[file_type.lower()] = (
+            1 - RATE_SMOOTHING
+        ) * rate + RATE_SMOOTHING * (file_size / parse_seconds)
+
+    def delay_per_byte(self, file_type: str) -> float:
+        """
+        Seconds the claim order of a job is pushed back by per byte of its file, 0
+        claims the oldest jobs first.
+        """
+        if self.policy == SchedulingPolicy.FIFO:
+            return 0.0
+        return 1 / (self.bytes_per_second(file_type) * self.aging_factor)
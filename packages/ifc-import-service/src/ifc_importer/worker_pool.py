@@ -0,0 +1,188 @@
+"""
+Pool of warm worker processes running `process_job`.
+
+Workers are forked from a forkserver that has already imported the job processing
+modules (specklepy, ifcopenshell, pydantic...), so a job does not pay for a fresh
+interpreter and its imports. Every job still runs in a separate process, which is
+killed when the job times out or leaves the worker in an unknown state.
+"""
+
+import asyncio
+import contextlib
+import multiprocessing
+import resource
+import time
+from multiprocessing.connection import Connection
+from multiprocessing.context import ForkServerContext
+
+import structlog
+
+from ifc_importer import metrics
+
+_PRELOAD_MODULES = ["ifc_importer.process_job"]
+_STOP_TIMEOUT = 10
+
+
+def _worker_main(connection: Connection) -> None:
+    from ifc_importer.logger import configure_logger
+    from ifc_importer.process_job import process_job
+
+    # the forkserver does not run `main`, workers log like the service
+    _ = configure_logger()
+
+    # Every message sent back to the pool is the peak RSS of the worker
+    connection.send(_peak_rss_mb())
+    while True:
+        try:
+            task = connection.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        work_dir_path, job_payload = task
+        process_job(work_dir_path, job_payload)
+        connection.send(_peak_rss_mb())
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class WorkerCrashedError(Exception):
+    pass
+
+
+class Worker:
+    def __init__(self, context: ForkServerContext):
+        self.connection, self._child_connection = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(self._child_connection,)
+        )
+        self.jobs = 0
+        self.peak_rss_mb = 0.0
+
+    async def start(self) -> None:
+        # The first start launches the forkserver and waits for its imports
+        await asyncio.to_thread(self.process.start)
+        self._child_connection.close()
+        self.peak_rss_mb = await self.receive()
+
+    async def receive(self) -> float:
+        loop = asyncio.get_running_loop()
+        readable = loop.create_future()
+
+        def on_readable() -> None:
+            if not readable.done():
+                readable.set_result(None)
+
+        loop.add_reader(self.connection.fileno(), on_readable)
+        try:
+            await readable
+        finally:
+            loop.remove_reader(self.connection.fileno())
+
+        try:
+            return self.connection.recv()
+        except EOFError:
+            await asyncio.to_thread(self.process.join, _STOP_TIMEOUT)
+            raise WorkerCrashedError(
+                f"Job failed with exit code {self.process.exitcode}"
+            ) from None
+
+    async def stop(self) -> None:
+        with contextlib.suppress(OSError):
+            self.connection.send(None)
+        await asyncio.to_thread(self.process.join, _STOP_TIMEOUT)
+        await self.kill()
+
+    async def kill(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+            await asyncio.to_thread(self.process.join)
+        self.connection.close()
+
+
+class WorkerPool:
+    """
+    Runs jobs on warm workers. A worker is replaced after `max_jobs` jobs, once its
+    peak RSS reaches `max_rss_mb`, or when a job did not complete normally.
+    """
+
+    def __init__(
+        self, logger: structlog.stdlib.BoundLogger, max_jobs: int, max_rss_mb: int
+    ):
+        self._logger = logger
+        self._max_jobs = max_jobs
+        self._max_rss_mb = max_rss_mb
+        self._context = multiprocessing.get_context("forkserver")
+        self._context.set_forkserver_preload(_PRELOAD_MODULES)
+        self._idle: list[Worker] = []
+        self.cold_start_seconds = 0.0
+
+    async def start(self, size: int) -> None:
+        """Start `size` workers, one for every job that may run concurrently."""
+        start = time.monotonic()
+        self._idle.append(await self._spawn())
+        # Starting the forkserver is what every job used to pay for
+        self.cold_start_seconds = time.monotonic() - start
+        metrics.worker_cold_start_seconds.set(self.cold_start_seconds)
+        for _ in range(size - 1):
+            self._idle.append(await self._spawn())
+        self._logger.info(
+            "worker pool started with {size} workers,"
+            + " cold start took {cold_start_seconds}s",
+            size=size,
+            cold_start_seconds=self.cold_start_seconds,
+        )
+
+    async def close(self) -> None:
+        while self._idle:
+            await self._idle.pop().stop()
+
+    async def run_job(self, work_dir_path: str, job_payload: str, job_timeout: int):
+        """
+        Run `process_job` on a worker. Raises `TimeoutError` if it does not finish
+        within `job_timeout` seconds and `WorkerCrashedError` if the worker died.
+        """
+        start = time.monotonic()
+        worker = self._idle.pop() if self._idle else await self._spawn()
+        waited = time.monotonic() - start
+        metrics.worker_jobs.inc()
+        metrics.worker_startup_seconds_saved.inc(
+            max(0.0, self.cold_start_seconds - waited)
+        )
+
+        worker.jobs += 1
+        try:
+            worker.connection.send((work_dir_path, job_payload))
+            worker.peak_rss_mb = await asyncio.wait_for(
+                worker.receive(), timeout=job_timeout
+            )
+        except (TimeoutError, WorkerCrashedError, OSError):
+            # the job did not complete, the worker cannot be reused
+            await worker.kill()
+            await self._recycle("failed")
+            raise
+        except asyncio.CancelledError:
+            await worker.kill()
+            raise
+
+        if worker.jobs >= self._max_jobs:
+            await worker.stop()
+            await self._recycle("max_jobs")
+        elif worker.peak_rss_mb >= self._max_rss_mb:
+            await worker.stop()
+            await self._recycle("max_rss")
+        else:
+            self._idle.append(worker)
+
+    async def _recycle(self, reason: str) -> None:
+        metrics.worker_recycles.labels(reason=reason).inc()
+        self._logger.info("replacing worker, reason: {reason}", reason=reason)
+        self._idle.append(await self._spawn())
+
+    async def _spawn(self) -> Worker:
+        worker = Worker(self._context)
+        await worker.start()
+        return worker
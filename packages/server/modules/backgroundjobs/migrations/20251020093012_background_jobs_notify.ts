@@ -0,0 +1,37 @@
+import type { Knex } from 'knex'
+
+const JOB_TABLE_NAME = 'background_jobs'
+// workers LISTEN on this channel to pick up new jobs without polling
+const NOTIFY_CHANNEL = 'background_jobs'
+const FUNCTION_NAME = 'background_jobs_notify_queued'
+const TRIGGER_NAME = 'background_jobs_notify_queued'
+
+export async function up(knex: Knex): Promise<void> {
+  await knex.raw(`
+    CREATE OR REPLACE FUNCTION ${FUNCTION_NAME}() RETURNS trigger AS $$
+    BEGIN
+      PERFORM pg_notify(
+        '${NOTIFY_CHANNEL}',
+        json_build_object(
+          'jobType', NEW."jobType",
+          'fileType', NEW.payload ->> 'fileType'
+        )::text
+      );
+      RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+  `)
+  // new jobs, and jobs returned to the queue
+  await knex.raw(`
+    CREATE TRIGGER ${TRIGGER_NAME}
+    AFTER INSERT OR UPDATE OF status ON ${JOB_TABLE_NAME}
+    FOR EACH ROW
+    WHEN (NEW.status = 'queued')
+    EXECUTE FUNCTION ${FUNCTION_NAME}();
+  `)
+}
+
+export async function down(knex: Knex): Promise<void> {
+  await knex.raw(`DROP TRIGGER IF EXISTS ${TRIGGER_NAME} ON ${JOB_TABLE_NAME};`)
+  await knex.raw(`DROP FUNCTION IF EXISTS ${FUNCTION_NAME}();`)
+}
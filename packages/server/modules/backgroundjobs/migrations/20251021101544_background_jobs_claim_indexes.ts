@@ -0,0 +1,25 @@
+import type { Knex } from 'knex'
+
+const JOB_TABLE_NAME = 'background_jobs'
+// file import workers claim the oldest job of their file type, these partial indexes
+// only hold the few jobs waiting or running, however many finished jobs the table has
+const QUEUED_INDEX_NAME = 'background_jobs_queued_file_type_idx'
+const PROCESSING_INDEX_NAME = 'background_jobs_processing_file_type_idx'
+
+export async function up(knex: Knex): Promise<void> {
+  await knex.raw(`
+    CREATE INDEX IF NOT EXISTS ${QUEUED_INDEX_NAME}
+    ON ${JOB_TABLE_NAME} ((payload ->> 'fileType'), "createdAt")
+    WHERE status = 'queued'
+  `)
+  await knex.raw(`
+    CREATE INDEX IF NOT EXISTS ${PROCESSING_INDEX_NAME}
+    ON ${JOB_TABLE_NAME} ((payload ->> 'fileType'), "updatedAt")
+    WHERE status = 'processing'
+  `)
+}
+
+export async function down(knex: Knex): Promise<void> {
+  await knex.raw(`DROP INDEX IF EXISTS ${QUEUED_INDEX_NAME}`)
+  await knex.raw(`DROP INDEX IF EXISTS ${PROCESSING_INDEX_NAME}`)
+}
@@ -83,7 +83,7 @@ export type UploadedFile = UploadResult & { userId: string }
 
 export type FileImportMessage = Pick<
   JobPayloadV1,
-  'modelId' | 'projectId' | 'fileType' | 'fileName' | 'blobId'
+  'modelId' | 'projectId' | 'fileType' | 'fileName' | 'fileSize' | 'blobId'
 > & { userId: string }
 
 export type ScheduleFileimportJob = (args: JobPayloadV1) => Promise<void>
@@ -20,6 +20,7 @@ export const pushJobToFileImporterFactory =
     userId,
     fileName,
     fileType,
+    fileSize,
     blobId
   }): Promise<void> => {
     const token = await deps.createAppToken({
@@ -48,6 +49,7 @@ export const pushJobToFileImporterFactory =
       modelId,
       fileType,
       projectId,
+      fileSize,
       timeOutSeconds: singleAttemptMaximumProcessingTimeSeconds(),
       blobId
     })
@@ -55,6 +55,7 @@ export const insertNewUploadAndNotifyFactoryV2 =
       scheduleJob: queue.scheduleJob,
       fileName: file.fileName,
       fileType: file.fileType,
+      fileSize: file.fileSize ?? undefined,
       projectId: file.projectId,
       modelId: upload.modelId,
       blobId: file.id,
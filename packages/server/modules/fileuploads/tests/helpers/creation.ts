@@ -36,6 +36,7 @@ export const buildFileUploadMessage = (
     projectId: cryptoRandomString({ length: 10 }),
     fileType: cryptoRandomString({ length: 10 }),
     fileName: cryptoRandomString({ length: 10 }),
+    fileSize: 1024,
     blobId: cryptoRandomString({ length: 10 }),
     userId: cryptoRandomString({ length: 10 })
   }
@@ -203,6 +203,7 @@ describe('FileUploads @fileuploads', () => {
           modelId: upload.modelId,
           fileType: upload.fileType,
           projectId: upload.projectId,
+          fileSize: upload.fileSize,
           timeOutSeconds: 1800,
           blobId: upload.blobId
         }
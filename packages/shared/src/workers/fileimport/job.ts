@@ -9,6 +9,14 @@ export const jobPayloadV1 = z.object({
   blobId: z.string(),
   fileType: z.string(),
   fileName: z.string(),
+  fileSize: z
+    .number()
+    .int()
+    .nonnegative()
+    .optional()
+    .describe(
+      'The size of the uploaded file, in bytes. Lets the importers schedule small files first.'
+    ),
   timeOutSeconds: z
     .number()
     .int()